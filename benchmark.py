@@ -0,0 +1,266 @@
+"""Offline benchmark for the profile -> reels -> sheet pipeline
+
+Record a real run once:
+    python reels.py --record-har recordings/run.har
+then replay it as often as needed, without touching Instagram or Google Sheets:
+    python benchmark.py recordings/run.har --output bench.json --compare previous_bench.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import re
+import tempfile
+import time
+
+import gspread
+
+PROFILE_URL_PATTERN = re.compile(
+    r'^https://www\.instagram\.com/(?!reels?/|p/|accounts/|explore/|stories/)[^/?#]+/?$'
+)
+
+class FakeWorksheet:
+    """In-memory stand-in for the gspread worksheet the scraper talks to"""
+
+    def __init__(self, urls):
+        self.rows = [['link']] + [[url] for url in urls]
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _set_cell(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        while len(cells) < col:
+            cells.append('')
+        cells[col - 1] = value
+
+    def row_values(self, row):
+        self._count('row_values')
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._count('col_values')
+        return [cells[col - 1] if len(cells) >= col else '' for cells in self.rows]
+
+    def get_all_records(self):
+        self._count('get_all_records')
+        headers = self.rows[0]
+        return [dict(zip(headers, cells)) for cells in self.rows[1:]]
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    def get(self, range_name):
+        self._count('get')
+        start, end = range_name.split(':')
+        first_row, first_col = gspread.utils.a1_to_rowcol(start)
+        last_row, last_col = gspread.utils.a1_to_rowcol(end)
+        values = [cells[first_col - 1:last_col] for cells in self.rows[first_row - 1:last_row]]
+        while values and not any(values[-1]):
+            values.pop()  # The API leaves out trailing empty rows
+        return values
+
+    def _write(self, range_name, values):
+        row, col = gspread.utils.a1_to_rowcol(range_name.split(':')[0])
+        for row_offset, row_values in enumerate(values):
+            for col_offset, value in enumerate(row_values):
+                self._set_cell(row + row_offset, col + col_offset, value)
+
+    def update(self, range_name, values):
+        self._count('update')
+        self._write(range_name, values)
+
+    def batch_update(self, updates):
+        self._count('batch_update')
+        for update in updates:
+            self._write(update['range'], update['values'])
+
+
+class ProtocolCounter:
+    """Counts round trips from the Python client to the Playwright driver, by method"""
+
+    def __init__(self):
+        self.calls = {}
+
+    def install(self):
+        try:
+            from playwright._impl._connection import Channel
+        except ImportError as e:
+            print(f"⚠️ Protocol call counting unavailable: {str(e)}")
+            return
+
+        for attr in ('send', 'send_return_as_dict', 'send_no_reply'):
+            original = getattr(Channel, attr, None)
+            if original is None:
+                continue
+            setattr(Channel, attr, self._counting(original))
+
+    def _counting(self, original):
+        counter = self
+
+        if asyncio.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def send(channel, method, *args, **kwargs):
+                counter.calls[method] = counter.calls.get(method, 0) + 1
+                return await original(channel, method, *args, **kwargs)
+        else:
+            @functools.wraps(original)
+            def send(channel, method, *args, **kwargs):
+                counter.calls[method] = counter.calls.get(method, 0) + 1
+                return original(channel, method, *args, **kwargs)
+        return send
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+
+def isolate_state(prefix, prometheus=False):
+    """Temp directory for a test run's cache, journal, selector stats and metrics
+
+    Only fills in settings the environment leaves unset. Call it before importing reels,
+    whose load_dotenv() would otherwise fill them in from the real .env.
+    """
+    work_dir = tempfile.mkdtemp(prefix=prefix)
+    os.environ.setdefault('CACHE_FILE', os.path.join(work_dir, 'cache.db'))
+    os.environ.setdefault('JOURNAL_FILE', os.path.join(work_dir, 'journal.db'))
+    os.environ.setdefault('SELECTOR_STATS_FILE', os.path.join(work_dir, 'selector_stats.json'))
+    os.environ.setdefault('METRICS_FILE', os.path.join(work_dir, 'metrics.jsonl'))
+    os.environ.setdefault('METRICS_PROM_FILE', os.path.join(work_dir, 'metrics.prom') if prometheus else '')
+    os.environ.setdefault('STORAGE_STATE_FILE', '')  # Test runs use a throwaway profile, not the exported login
+    return work_dir
+
+
+def profile_urls_from_har(har_path):
+    """Profile page URLs found in a recording, in the order they were visited"""
+    with open(har_path, 'r', encoding='utf-8') as f:
+        har = json.load(f)
+    urls = []
+    for entry in har.get('log', {}).get('entries', []):
+        url = entry['request']['url']
+        mime_type = entry.get('response', {}).get('content', {}).get('mimeType', '')
+        if 'html' in mime_type and PROFILE_URL_PATTERN.match(url) and url not in urls:
+            urls.append(url)
+    return urls
+
+
+async def run_benchmark(har_path, urls, workers):
+    """Replay the full pipeline against a recording and collect measurements"""
+    work_dir = isolate_state('reels_bench_')
+    from reels import InstagramScraper, RateLimiter, SheetWriter
+
+    scraper = InstagramScraper(connect_sheets=False)
+    scraper.har_replay_path = har_path
+    scraper.user_data_dir = os.path.join(work_dir, 'user_data')
+    scraper.max_workers = workers
+    scraper.force_refresh = True
+    scraper.rate_limiter = RateLimiter(0)  # No need to pace a replay
+
+    sheet = FakeWorksheet(urls)
+    scraper.worksheet = sheet
+    scraper.sheet_writer = SheetWriter(sheet)
+
+    protocol = ProtocolCounter()
+    protocol.install()
+
+    transfer = {'responses': 0, 'bytes': 0}
+
+    def on_response(response):
+        transfer['responses'] += 1
+        try:
+            transfer['bytes'] += int(response.headers.get('content-length', 0))
+        except ValueError:
+            pass
+
+    started = time.perf_counter()
+    try:
+        await scraper.setup_browser()
+        scraper.context.on('response', on_response)
+        await scraper.scrape_from_sheet()
+    finally:
+        await scraper.cleanup()
+    wall_seconds = time.perf_counter() - started
+    # Per-stage timings come from the scraper's own spans
+    spans = scraper.metrics.summary()['spans']
+
+    return {
+        'har': har_path,
+        'profiles': len(urls),
+        'scraped': scraper.result_stats.get('scraped', 0),
+        'workers': workers,
+        'wall_seconds': round(wall_seconds, 3),
+        'stages': {
+            name: {key: span[key] for key in ('calls', 'seconds', 'mean_ms', 'max_ms')}
+            for name, span in spans.items()
+        },
+        'protocol_calls': protocol.total,
+        'protocol_calls_by_method': dict(sorted(protocol.calls.items(), key=lambda item: -item[1])),
+        'responses': transfer['responses'],
+        'bytes_transferred': transfer['bytes'],
+        'sheet_calls': sheet.calls,
+    }
+
+
+def print_report(report, previous=None):
+    def delta(current, old):
+        if not old:
+            return ''
+        return f" ({(current - old) / old * 100:+.1f}%)"
+
+    previous = previous or {}
+    previous_stages = previous.get('stages', {})
+    print("\n📊 Benchmark results")
+    print("=" * 50)
+    print(f"Profiles: {report['scraped']}/{report['profiles']} with {report['workers']} worker(s)")
+    print(f"Wall time: {report['wall_seconds']:.2f}s{delta(report['wall_seconds'], previous.get('wall_seconds'))}")
+    print(f"\n{'Stage':<24}{'Calls':>8}{'Total s':>10}{'Mean ms':>10}")
+    for name, stage in report['stages'].items():
+        old_seconds = previous_stages.get(name, {}).get('seconds')
+        print(f"{name:<24}{stage['calls']:>8}{stage['seconds']:>10.2f}{stage['mean_ms']:>10.1f}"
+              f"{delta(stage['seconds'], old_seconds)}")
+    print(f"\nProtocol calls: {report['protocol_calls']}{delta(report['protocol_calls'], previous.get('protocol_calls'))}")
+    for method, count in list(report['protocol_calls_by_method'].items())[:10]:
+        print(f"  {method:<30}{count:>8}")
+    print(f"Responses: {report['responses']}, bytes transferred: {report['bytes_transferred']:,}"
+          f"{delta(report['bytes_transferred'], previous.get('bytes_transferred'))}")
+    print(f"Sheet calls: {report['sheet_calls']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay a recorded run and report per-stage performance')
+    parser.add_argument('har', help='HAR file recorded with reels.py --record-har')
+    parser.add_argument('--urls', nargs='+', help='Profile URLs to replay (default: every profile in the HAR)')
+    parser.add_argument('--workers', type=int, default=1, help='Concurrent profile workers')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier --output file to compare against')
+    return parser.parse_args()
+
+
+async def main(args):
+    urls = args.urls or profile_urls_from_har(args.har)
+    if not urls:
+        print(f"❌ No profile pages found in {args.har}")
+        return
+
+    print(f"📼 Replaying {len(urls)} profiles from {args.har}")
+    report = await run_benchmark(args.har, urls, args.workers)
+
+    previous = None
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    print_report(report, previous)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
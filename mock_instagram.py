@@ -0,0 +1,428 @@
+"""Local stand-in for Instagram, for load-testing the scraper without an account
+
+Serves synthetic profile pages, reels grids and reel detail pages shaped like the
+markup POST_SELECTORS / MODAL_SELECTORS expect, plus the JSON API responses the
+network capture reads. Latency, error rate and 429 throttling are configurable.
+
+Run just the server:
+    python mock_instagram.py serve --port 8800 --latency-ms 150
+Run a load test against a fresh server:
+    python mock_instagram.py loadtest --profiles 10000 --workers 8 --rate-429 0.005
+"""
+import argparse
+import asyncio
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+THROTTLE_TEXT = 'Please wait a few minutes before you try again.'
+
+
+class MockSettings:
+    """Knobs shared by every request handler of a server"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_429=0.0,
+                 reels_per_profile=12, api_metrics=True):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.reels_per_profile = reels_per_profile
+        self.api_metrics = api_metrics  # Include likes/comments in API JSON (lets reel pages be skipped)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+def _rng(*parts):
+    """Deterministic random source per username/reel so pages are stable across visits"""
+    seed = hashlib.sha1('/'.join(parts).encode('utf-8')).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _compact(count):
+    if count >= 1000000:
+        return f'{count / 1000000:.1f}M'
+    if count >= 1000:
+        return f'{count / 1000:.1f}K'
+    return str(count)
+
+
+def synthetic_profile(username, reels_per_profile):
+    rng = _rng(username)
+    return {
+        'username': username,
+        'full_name': f'{username.replace("_", " ").title()}',
+        'biography': f'Synthetic account {username} | contact {username}@example.com',
+        'follower_count': rng.randint(100, 5000000),
+        'media_count': rng.randint(reels_per_profile, 3000),
+        'profile_pic_url': f'/static/{username}.jpg',
+        'reels': [f'{username}-{i:02d}{rng.randint(0, 9999):04d}' for i in range(reels_per_profile)],
+    }
+
+
+def synthetic_reel(username, code):
+    rng = _rng(username, code)
+    return {
+        'code': code,
+        'like_count': rng.randint(0, 200000),
+        'comment_count': rng.randint(0, 5000),
+        'play_count': rng.randint(1000, 10000000),
+        'taken_at': int(time.time()) - rng.randint(3600, 3600 * 24 * 365),
+        'caption': {'text': f'Reel {code} by {username} #synthetic'},
+    }
+
+
+def owner_of(code):
+    """Reel codes are '<username>-<suffix>' so reel pages can be rendered without server state"""
+    return code.rsplit('-', 1)[0]
+
+
+PAGE_STYLE = """
+<style>
+  body { margin: 0; font-family: sans-serif; }
+  .grid { display: grid; grid-template-columns: repeat(3, 120px); gap: 4px; }
+  .grid a { display: block; height: 200px; background: #ddd; }
+</style>
+"""
+
+
+def render_home():
+    return f"""<!DOCTYPE html><html><head><title>Instagram</title>{PAGE_STYLE}</head>
+<body><nav><a href="/"><svg aria-label="Home" width="24" height="24"></svg></a></nav>
+<main><a href="/p/home0001/">post</a></main></body></html>"""
+
+
+def render_profile(profile, api_metrics):
+    username = html.escape(profile['username'])
+    name = html.escape(profile['full_name'])
+    bio = html.escape(profile['biography'])
+    followers = _compact(profile['follower_count'])
+    og_description = (f"{followers} Followers, 100 Following, {profile['media_count']:,} Posts - "
+                      f"See Instagram photos and videos from {name} (@{username})")
+    api_script = ''
+    if api_metrics:
+        api_script = f"<script>fetch('/api/v1/users/web_profile_info/?username={username}')</script>"
+    return f"""<!DOCTYPE html><html><head>
+<meta property="og:title" content="{name} (@{username}) &bull; Instagram photos and videos">
+<meta property="og:description" content="{html.escape(og_description)}">
+<title>{name} (@{username})</title>{PAGE_STYLE}</head>
+<body><nav><a href="/"><svg aria-label="Home" width="24" height="24"></svg></a></nav>
+<main><section><header>
+  <img alt="{username}'s profile picture" src="{profile['profile_pic_url']}">
+  <section>
+    <h2>{username}</h2>
+    <ul>
+      <li><span>{profile['media_count']:,} posts</span></li>
+      <li><span><span>{followers}</span> followers</span></li>
+      <li><span>100 following</span></li>
+    </ul>
+    <div><h1 dir="auto">{name}</h1><div data-testid="user-bio">{bio}</div></div>
+  </section>
+</header>
+<div role="tablist"><a href="/{username}/">Posts</a><a href="/{username}/reels/">Reels</a></div>
+</section></main>{api_script}</body></html>"""
+
+
+def render_reels_grid(profile):
+    username = html.escape(profile['username'])
+    # The grid is rendered from the clips API response, like the real app
+    return f"""<!DOCTYPE html><html><head><title>{username} reels</title>{PAGE_STYLE}</head>
+<body><main><section><div role="tabpanel"><div class="grid" id="grid"></div></div></section></main>
+<script>
+fetch('/api/v1/clips/user/?username={username}')
+  .then(r => r.json())
+  .then(data => {{
+    const grid = document.getElementById('grid');
+    for (const item of data.items) {{
+      const link = document.createElement('a');
+      link.href = '/reel/' + item.media.code + '/';
+      const views = document.createElement('span');
+      views.className = '_ac2a';
+      views.textContent = item.media.play_count_text;
+      link.appendChild(views);
+      grid.appendChild(link);
+    }}
+  }});
+</script></body></html>"""
+
+
+def render_reel(username, reel):
+    timestamp = datetime.fromtimestamp(reel['taken_at'], tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    caption = html.escape(reel['caption']['text'])
+    return f"""<!DOCTYPE html><html><head><title>Reel</title>{PAGE_STYLE}</head>
+<body><main><article>
+  <div class="_a9zs"><h1 dir="auto">{html.escape(username)}: {caption}</h1></div>
+  <section>
+    <div><button>Like</button></div>
+    <div><div><div><span>{reel['like_count']:,} likes</span></div></div></div>
+  </section>
+  <a href="/reel/{reel['code']}/comments/"><span>View all {reel['comment_count']} comments</span></a>
+  <time class="_aaqe" datetime="{timestamp}">1d</time>
+</article></main></body></html>"""
+
+
+class MockInstagramHandler(BaseHTTPRequestHandler):
+    settings = MockSettings()
+
+    def log_message(self, format, *args):
+        pass  # Keep load-test output readable
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _profile(self, username):
+        return synthetic_profile(username, self.settings.reels_per_profile)
+
+    def do_GET(self):
+        settings = self.settings
+        settings.count('requests')
+        if settings.latency_ms or settings.jitter_ms:
+            time.sleep(max(0.0, settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)) / 1000)
+
+        roll = random.random()
+        if roll < settings.rate_429:
+            settings.count('throttled')
+            self._send(429, f'<html><body><p>{THROTTLE_TEXT}</p></body></html>')
+            return
+        if roll < settings.rate_429 + settings.error_rate:
+            settings.count('errors')
+            self._send(500, '<html><body>Something went wrong</body></html>')
+            return
+
+        parsed = urlparse(self.path)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+
+        if path == '/':
+            self._send(200, render_home())
+            return
+
+        if path.startswith('/static/'):
+            self._send(200, '', content_type='image/jpeg')
+            return
+
+        if path == '/api/v1/users/web_profile_info/':
+            profile = self._profile(query.get('username', [''])[0])
+            user = {key: value for key, value in profile.items() if key != 'reels'}
+            self._send(200, json.dumps({'data': {'user': user}}), content_type='application/json')
+            return
+
+        if path == '/api/v1/clips/user/':
+            profile = self._profile(query.get('username', [''])[0])
+            items = []
+            for code in profile['reels']:
+                reel = synthetic_reel(profile['username'], code)
+                media = {'code': code, 'play_count_text': _compact(reel['play_count'])}
+                if settings.api_metrics:
+                    media.update(reel)
+                items.append({'media': media})
+            self._send(200, json.dumps({'items': items}), content_type='application/json')
+            return
+
+        match = re.fullmatch(r'/reel/([\w.-]+)/(comments/)?', path)
+        if match:
+            code = match.group(1)
+            username = owner_of(code)
+            self._send(200, render_reel(username, synthetic_reel(username, code)))
+            return
+
+        match = re.fullmatch(r'/([\w.]+)/(reels/)?', path)
+        if match:
+            profile = self._profile(match.group(1))
+            if match.group(2):
+                self._send(200, render_reels_grid(profile))
+            else:
+                self._send(200, render_profile(profile, settings.api_metrics))
+            return
+
+        self._send(404, '<html><body>Not found</body></html>')
+
+
+def start_server(settings, host='127.0.0.1', port=0):
+    """Start the mock server on a background thread
+
+    Returns:
+        tuple: (server, base_url)
+    """
+    handler = type('BoundMockHandler', (MockInstagramHandler,), {'settings': settings})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def process_tree_rss():
+    """Resident memory in bytes of this process and its children (Chromium), Linux only - 0 where it can't be measured"""
+    try:
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        children = {}
+        rss = {}
+        for pid in filter(str.isdigit, os.listdir('/proc')):
+            try:
+                with open(f'/proc/{pid}/stat', 'r') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                children.setdefault(int(fields[1]), []).append(int(pid))
+                rss[int(pid)] = int(fields[21]) * page_size
+            except (OSError, IndexError, ValueError):
+                continue
+        total = 0
+        stack = [os.getpid()]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, []))
+        return total
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+        except ImportError:  # Windows has neither /proc nor resource
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load_test(args):
+    from benchmark import FakeWorksheet, isolate_state
+    work_dir = isolate_state('reels_loadtest_', prometheus=True)
+    from reels import InstagramScraper, RateLimiter, SheetWriter
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_429=args.rate_429, reels_per_profile=args.reels, api_metrics=not args.no_api_metrics
+    )
+    server, base_url = start_server(settings)
+    print(f"🧪 Mock Instagram running at {base_url}")
+
+    urls = [f'{base_url}/user{i:05d}/' for i in range(args.profiles)]
+    scraper = InstagramScraper(connect_sheets=False)
+    scraper.base_url = base_url
+    scraper.user_data_dir = os.path.join(work_dir, 'user_data')
+    scraper.max_workers = args.workers
+    scraper.rate_limiter = RateLimiter(args.rate, min_per_minute=args.rate / 10, max_per_minute=args.rate * 2,
+                                       cooldown_seconds=args.cooldown, max_cooldown_seconds=args.cooldown * 8)
+    scraper.rate_limiter.metrics = scraper.metrics
+    scraper.force_refresh = True
+    sheet = FakeWorksheet(urls)
+    scraper.worksheet = sheet
+    scraper.sheet_writer = SheetWriter(sheet)
+
+    latencies = []
+    memory_samples = []
+    scrape_profile = scraper.scrape_profile
+
+    async def timed_scrape_profile(*a, **kw):
+        started = time.perf_counter()
+        try:
+            return await scrape_profile(*a, **kw)
+        finally:
+            latencies.append(time.perf_counter() - started)
+            if len(latencies) % args.sample_every == 0:
+                memory_samples.append((len(latencies), process_tree_rss()))
+                elapsed = time.perf_counter() - run_started
+                print(f"📈 {len(latencies)} profiles, {len(latencies) / elapsed * 60:.1f}/min, "
+                      f"RSS {memory_samples[-1][1] / 1024 / 1024:.0f} MB")
+
+    scraper.scrape_profile = timed_scrape_profile
+
+    run_started = time.perf_counter()
+    try:
+        await scraper.setup_browser()
+        memory_start = process_tree_rss()
+        memory_samples.append((0, memory_start))
+        await scraper.scrape_from_sheet()
+        memory_end = process_tree_rss()
+    finally:
+        await scraper.cleanup()
+        server.shutdown()
+    elapsed = time.perf_counter() - run_started
+
+    print("\n📊 Load test results")
+    print("=" * 50)
+    print(f"Profiles: {scraper.result_stats.get('scraped', 0)}/{len(urls)} scraped with {args.workers} worker(s)")
+    print(f"Throughput: {len(latencies) / elapsed * 60:.1f} profiles/minute over {elapsed:.1f}s")
+    print(f"Per-profile latency: p50 {percentile(latencies, 50):.2f}s, p95 {percentile(latencies, 95):.2f}s, "
+          f"mean {statistics.mean(latencies) if latencies else 0:.2f}s")
+    growth = memory_end - memory_start
+    per_thousand = growth / max(1, len(latencies)) * 1000
+    print(f"Memory (Python + browser): {memory_start / 1024 / 1024:.0f} MB -> {memory_end / 1024 / 1024:.0f} MB "
+          f"({growth / 1024 / 1024:+.0f} MB, {per_thousand / 1024 / 1024:+.1f} MB per 1k profiles)")
+    throttled = sum(value for (name, _), value in scraper.metrics.counters.items() if name == 'throttle_signals')
+    print(f"Throttle signals seen by the scraper: {throttled}, final rate {scraper.rate_limiter.rate * 60:.1f}/min")
+    print(f"Server: {settings.stats['requests']} requests, {settings.stats['throttled']} throttled (429), "
+          f"{settings.stats['errors']} errors (500)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Mock Instagram server and scraper load test')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_server_options(sub):
+        sub.add_argument('--latency-ms', type=float, default=0, help='Added latency per request')
+        sub.add_argument('--jitter-ms', type=float, default=0, help='Random +/- jitter on the latency')
+        sub.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+        sub.add_argument('--rate-429', type=float, default=0.0, help='Fraction of requests answered with 429')
+        sub.add_argument('--reels', type=int, default=12, help='Reels per synthetic profile')
+        sub.add_argument('--no-api-metrics', action='store_true',
+                         help='Leave likes/comments out of API JSON so reel pages have to be opened')
+
+    serve = subparsers.add_parser('serve', help='Run the mock server in the foreground')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8800)
+    add_server_options(serve)
+
+    loadtest = subparsers.add_parser('loadtest', help='Scrape synthetic profiles from a fresh mock server')
+    loadtest.add_argument('--profiles', type=int, default=1000, help='Number of synthetic profiles')
+    loadtest.add_argument('--workers', type=int, default=4, help='Concurrent profile workers')
+    loadtest.add_argument('--rate', type=float, default=0, help='Profiles per minute for the rate limiter (0 = unpaced)')
+    loadtest.add_argument('--cooldown', type=float, default=5, help='Rate limiter cooldown after the first throttle signal')
+    loadtest.add_argument('--sample-every', type=int, default=100, help='Print progress every N profiles')
+    add_server_options(loadtest)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'serve':
+        settings = MockSettings(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+            rate_429=args.rate_429, reels_per_profile=args.reels, api_metrics=not args.no_api_metrics
+        )
+        server, base_url = start_server(settings, args.host, args.port)
+        print(f"🧪 Mock Instagram running at {base_url} (Ctrl+C to stop)")
+        print(f"   Point the scraper at it with INSTAGRAM_BASE_URL={base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        asyncio.run(run_load_test(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,1683 @@
+import argparse
 import asyncio
-import pandas as pd
+import csv
 import json
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from playwright.async_api import async_playwright
 import time
+import functools
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
 import os
+import queue
+import shutil
+import sqlite3
+from html.parser import HTMLParser
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 import gspread
+from openpyxl import load_workbook
 from google.oauth2.service_account import Credentials
 
 # Load environment variables
 load_dotenv()
 
+
+def env_flag(name, default=False):
+    """Read a boolean setting from the environment (1/true/yes/on)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+async def iterate_async(items):
+    """Iterate a plain or async iterable the same way"""
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+# Per-stage timings of the profile currently being scraped (see RunMetrics.profile)
+_profile_spans = contextvars.ContextVar('profile_spans', default=None)
+
+
+class RunMetrics:
+    """Timing spans, counters and gauges for one scrape run
+    
+    span() times a block of work under a stage name. Spans recorded inside a
+    profile() scope - including reel tabs the profile fans out to - also go into
+    that profile's own breakdown, which is appended to a JSONL file as soon as the
+    profile is done. close() appends a run summary line. The aggregates are also
+    written as a Prometheus text snapshot (atomically, for a textfile collector).
+    """
+    PROM_PREFIX = 'instagram_scraper'
+
+    def __init__(self, jsonl_path='', prom_path='', prom_interval=15):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.prom_interval = prom_interval  # Minimum seconds between snapshots mid-run
+        self.run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        self.started = time.time()
+        self.spans = {}  # stage -> {'calls', 'errors', 'seconds', 'max_seconds'}
+        self.counters = {}  # (name, ((label, value), ...)) -> value
+        self.gauges = {}  # Same keys as counters
+        self.last_prom_write = 0.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            jsonl_path=os.getenv('METRICS_FILE', 'scrape_metrics.jsonl'),
+            prom_path=os.getenv('METRICS_PROM_FILE', 'scrape_metrics.prom')
+        )
+
+    def observe(self, stage, seconds, failed=False):
+        """Add one finished span"""
+        entry = self.spans.setdefault(stage, {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+        entry['calls'] += 1
+        entry['errors'] += int(failed)
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        breakdown = _profile_spans.get()
+        if breakdown is not None:
+            item = breakdown.setdefault(stage, {'calls': 0, 'seconds': 0.0})
+            item['calls'] += 1
+            item['seconds'] += seconds
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        """Time the body of a with block; an exception counts as an error for the stage"""
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, failed)
+
+    @contextlib.contextmanager
+    def profile(self, profile_url):
+        """Scope collecting every span of one profile
+        
+        Set record['ok'] when it succeeded, and record['throttled'] to the reason when
+        Instagram throttled it.
+        """
+        breakdown = {}
+        record = {'ok': False}
+        token = _profile_spans.set(breakdown)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            _profile_spans.reset(token)
+            seconds = time.perf_counter() - started
+            self.observe('profile', seconds, failed=not record['ok'])
+            self.count('profiles', result='ok' if record['ok'] else 'failed')
+            self.append_jsonl({
+                'type': 'profile',
+                'run_id': self.run_id,
+                'url': profile_url,
+                'ok': record['ok'],
+                'throttled': record.get('throttled'),
+                'seconds': round(seconds, 3),
+                'spans': {
+                    stage: {'calls': item['calls'], 'seconds': round(item['seconds'], 3)}
+                    for stage, item in breakdown.items()
+                },
+            })
+            if time.monotonic() - self.last_prom_write >= self.prom_interval:
+                self.write_prometheus()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def count(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        self.gauges[self._key(name, labels)] = value
+
+    def summary(self):
+        """Run totals as a JSON-friendly dict"""
+        def flatten(metrics):
+            return {
+                name + ''.join(f'[{label}={value}]' for label, value in labels): amount
+                for (name, labels), amount in sorted(metrics.items())
+            }
+
+        return {
+            'type': 'run',
+            'run_id': self.run_id,
+            'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            'wall_seconds': round(time.time() - self.started, 3),
+            'spans': {
+                stage: {
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'seconds': round(entry['seconds'], 3),
+                    'mean_ms': round(entry['seconds'] / entry['calls'] * 1000, 1) if entry['calls'] else 0.0,
+                    'max_ms': round(entry['max_seconds'] * 1000, 1),
+                }
+                for stage, entry in sorted(self.spans.items())
+            },
+            'counters': flatten(self.counters),
+            'gauges': flatten(self.gauges),
+        }
+
+    def append_jsonl(self, record):
+        if not self.jsonl_path:
+            return
+        try:
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except Exception as e:
+            print(f"⚠️ Could not write metrics to {self.jsonl_path}: {str(e)}")
+
+    def prometheus_text(self):
+        """Aggregates in the Prometheus text exposition format"""
+        prefix = self.PROM_PREFIX
+
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def number(value):
+            # Full precision: :g would round large counters to 6 digits (1.23457e+06)
+            return str(int(value)) if isinstance(value, int) else repr(float(value))
+
+        def labels_text(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{label}="{escape(value)}"' for label, value in labels) + '}'
+
+        lines = []
+        span_metrics = [
+            ('stage_calls_total', 'counter', 'Spans finished per stage', 'calls'),
+            ('stage_errors_total', 'counter', 'Spans that raised per stage', 'errors'),
+            ('stage_seconds_total', 'counter', 'Seconds spent per stage', 'seconds'),
+            ('stage_seconds_max', 'gauge', 'Longest single span per stage', 'max_seconds'),
+        ]
+        for metric, metric_type, help_text, field in span_metrics:
+            lines.append(f'# HELP {prefix}_{metric} {help_text}')
+            lines.append(f'# TYPE {prefix}_{metric} {metric_type}')
+            for stage, entry in sorted(self.spans.items()):
+                lines.append(f'{prefix}_{metric}{labels_text((("stage", stage),))} {number(entry[field])}')
+
+        for metrics, metric_type, suffix in ((self.counters, 'counter', '_total'), (self.gauges, 'gauge', '')):
+            names = sorted({name for name, _ in metrics})
+            for name in names:
+                lines.append(f'# TYPE {prefix}_{name}{suffix} {metric_type}')
+                for (metric_name, labels), amount in sorted(metrics.items()):
+                    if metric_name == name:
+                        lines.append(f'{prefix}_{name}{suffix}{labels_text(labels)} {number(amount)}')
+
+        lines.append(f'# TYPE {prefix}_run_start_timestamp_seconds gauge')
+        lines.append(f'{prefix}_run_start_timestamp_seconds {self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self):
+        """Write the snapshot atomically so a collector never reads half a file"""
+        self.last_prom_write = time.monotonic()
+        if not self.prom_path:
+            return
+        try:
+            tmp_path = f'{self.prom_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.prom_path)
+        except Exception as e:
+            print(f"⚠️ Could not write metrics to {self.prom_path}: {str(e)}")
+
+    def close(self):
+        """Append the run summary and write the final snapshot"""
+        self.append_jsonl(self.summary())
+        self.write_prometheus()
+
+    def print_summary(self):
+        print("\n⏱️ Time per stage:")
+        for stage, entry in sorted(self.spans.items(), key=lambda item: -item[1]['seconds']):
+            mean_ms = entry['seconds'] / entry['calls'] * 1000 if entry['calls'] else 0.0
+            errors = f", {entry['errors']} errors" if entry['errors'] else ''
+            print(f"   {stage:<24}{entry['calls']:>6} calls {entry['seconds']:>9.1f}s total {mean_ms:>8.0f}ms mean{errors}")
+
+
+def timed_stage(stage):
+    """Record every call of an async InstagramScraper method as a span of its metrics"""
+    def decorate(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            with self.metrics.span(stage):
+                return await method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class ResponseCapture:
+    """Collect profile and reel fields from the JSON API responses a page downloads
+    
+    Attach it to a page before navigating; every GraphQL / api/v1 JSON response is
+    parsed and any user or media objects found in it are indexed by username and
+    shortcode so the scraper can skip the DOM for fields the app already fetched.
+    """
+    API_URL_PATTERN = re.compile(r'/graphql|/api/v1/')
+
+    def __init__(self):
+        self.profiles = {}  # Lowercased username -> profile fields
+        self.media = {}  # Shortcode -> reel fields
+        self._pending = set()
+        self._pages = []
+
+    def attach(self, page):
+        """Start listening to a page's network responses"""
+        page.on('response', self._on_response)
+        self._pages.append(page)
+
+    def detach(self, page=None):
+        """Stop listening on one attached page, or on every attached page"""
+        pages = self._pages if page is None else [p for p in self._pages if p is page]
+        for attached in pages:
+            try:
+                attached.remove_listener('response', self._on_response)
+            except Exception:
+                pass
+        self._pages = [p for p in self._pages if p not in pages]
+
+    def _on_response(self, response):
+        if not self.API_URL_PATTERN.search(response.url):
+            return
+        content_type = response.headers.get('content-type', '')
+        if 'json' not in content_type and 'javascript' not in content_type:
+            return
+        task = asyncio.ensure_future(self._read_response(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read_response(self, response):
+        try:
+            self.ingest(await response.json())
+        except Exception:
+            pass  # Non-JSON or aborted bodies are just ignored
+
+    async def settle(self):
+        """Wait for response bodies that are still being read"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def ingest(self, payload):
+        """Index every user and media object found anywhere in a JSON payload"""
+        stack = [payload]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict):
+                continue
+
+            profile = self.parse_profile(node)
+            if profile:
+                key = profile['username'].lower()
+                self.profiles.setdefault(key, {}).update(profile)
+
+            media = self.parse_media(node)
+            if media:
+                self.media.setdefault(media['shortcode'], {}).update(media)
+
+            stack.extend(value for value in node.values() if isinstance(value, (dict, list)))
+
+    def get_profile(self, username):
+        """Fields captured for a username (empty dict if none)"""
+        return self.profiles.get((username or '').lower(), {})
+
+    def get_media(self, url):
+        """Fields captured for a reel/post URL (empty dict if none)"""
+        match = re.search(r'/(?:reel|p)/([^/?#]+)', url or '')
+        return self.media.get(match.group(1), {}) if match else {}
+
+    @staticmethod
+    def _edge_count(node, key):
+        edge = node.get(key)
+        if isinstance(edge, dict) and isinstance(edge.get('count'), int):
+            return edge['count']
+        return None
+
+    @classmethod
+    def parse_profile(cls, node):
+        """Extract profile fields from a user object, or None if node isn't one"""
+        username = node.get('username')
+        if not isinstance(username, str):
+            return None
+        markers = ('follower_count', 'edge_followed_by', 'media_count',
+                   'edge_owner_to_timeline_media', 'biography')
+        if not any(marker in node for marker in markers):
+            return None
+
+        profile = {'username': username}
+        followers = node.get('follower_count')
+        if not isinstance(followers, int):
+            followers = cls._edge_count(node, 'edge_followed_by')
+        if followers is not None:
+            profile['followers'] = followers
+
+        media_count = node.get('media_count')
+        if not isinstance(media_count, int):
+            media_count = cls._edge_count(node, 'edge_owner_to_timeline_media')
+        if media_count is not None:
+            profile['totalposts'] = media_count
+
+        if node.get('full_name'):
+            profile['name'] = node['full_name']
+        if node.get('biography'):
+            profile['description'] = node['biography']
+        avatar = node.get('profile_pic_url_hd') or node.get('profile_pic_url')
+        if avatar:
+            profile['avatar'] = avatar
+        return profile
+
+    @classmethod
+    def parse_media(cls, node):
+        """Extract reel fields from a media object, or None if node isn't one"""
+        shortcode = node.get('code') or node.get('shortcode')
+        if not isinstance(shortcode, str):
+            return None
+        markers = ('like_count', 'comment_count', 'edge_media_preview_like',
+                   'edge_liked_by', 'edge_media_to_comment', 'taken_at', 'taken_at_timestamp')
+        if not any(marker in node for marker in markers):
+            return None
+
+        media = {'shortcode': shortcode}
+        likes = node.get('like_count')
+        if not isinstance(likes, int):
+            likes = cls._edge_count(node, 'edge_media_preview_like')
+        if likes is None:
+            likes = cls._edge_count(node, 'edge_liked_by')
+        if likes is not None:
+            media['likesCount'] = likes
+
+        comments = node.get('comment_count')
+        if not isinstance(comments, int):
+            comments = cls._edge_count(node, 'edge_media_to_comment')
+        if comments is not None:
+            media['commentsCount'] = comments
+
+        views = node.get('play_count') or node.get('view_count') or node.get('video_view_count')
+        if isinstance(views, int):
+            media['viewCount'] = views
+
+        caption = node.get('caption')
+        if isinstance(caption, dict) and caption.get('text'):
+            media['caption'] = caption['text']
+        else:
+            edges = (node.get('edge_media_to_caption') or {}).get('edges') or []
+            if edges and edges[0].get('node', {}).get('text'):
+                media['caption'] = edges[0]['node']['text']
+
+        taken_at = node.get('taken_at') or node.get('taken_at_timestamp')
+        if isinstance(taken_at, (int, float)):
+            # Same format as the <time datetime="..."> attribute on reel pages
+            media['timestamp'] = datetime.fromtimestamp(taken_at, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        return media
+
+
+class RequestFilter:
+    """Allow/deny layer for a browser context's requests, built on context.route
+    
+    Requests are blocked by resource type (images, media, fonts by default) or by
+    URL pattern (trackers/logging); allow patterns always win. Counters record what
+    was blocked and how many bytes the allowed responses transferred.
+    """
+    DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+    DEFAULT_DENY_PATTERNS = (
+        r'google-analytics\.com',
+        r'googletagmanager\.com',
+        r'doubleclick\.net',
+        r'connect\.facebook\.net',
+        r'facebook\.com/tr',
+        r'/logging_client_events',
+        r'/ajax/bz',
+        r'/falco',
+    )
+    # Byte ranges Instagram puts on video segment URLs, or a standard Range header
+    BYTE_RANGE_PATTERN = re.compile(r'bytestart=(\d+).*?byteend=(\d+)')
+    RANGE_HEADER_PATTERN = re.compile(r'bytes=(\d+)-(\d+)')
+
+    def __init__(self, blocked_types=None, deny_patterns=None, allow_patterns=None):
+        self.blocked_types = set(self.DEFAULT_BLOCKED_TYPES if blocked_types is None else blocked_types)
+        self.deny_patterns = [re.compile(p) for p in (self.DEFAULT_DENY_PATTERNS if deny_patterns is None else deny_patterns)]
+        self.allow_patterns = [re.compile(p) for p in (allow_patterns or [])]
+        self.reset_stats()
+
+    @classmethod
+    def from_env(cls):
+        """Build a filter from BLOCK_RESOURCE_TYPES / BLOCK_URL_PATTERNS / ALLOW_URL_PATTERNS"""
+        def read_list(name):
+            value = os.getenv(name)
+            if value is None:
+                return None
+            return [item.strip() for item in value.split(',') if item.strip()]
+        return cls(
+            blocked_types=read_list('BLOCK_RESOURCE_TYPES'),
+            deny_patterns=read_list('BLOCK_URL_PATTERNS'),
+            allow_patterns=read_list('ALLOW_URL_PATTERNS'),
+        )
+
+    def reset_stats(self):
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+        self.blocked_requests = 0
+        self.blocked_bytes = 0  # Only counts requests whose size is known from a byte range
+        self.blocked_by_type = {}
+
+    def should_block(self, resource_type, url):
+        """Decide whether a request is blocked"""
+        if any(pattern.search(url) for pattern in self.allow_patterns):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return any(pattern.search(url) for pattern in self.deny_patterns)
+
+    def _known_size(self, request):
+        match = self.BYTE_RANGE_PATTERN.search(request.url)
+        if not match:
+            match = self.RANGE_HEADER_PATTERN.search(request.headers.get('range', ''))
+        if match:
+            return int(match.group(2)) - int(match.group(1)) + 1
+        return 0
+
+    async def install(self, context):
+        """Route every request of a context through the filter"""
+        await context.route('**/*', self._handle_route)
+        context.on('response', self._on_response)
+
+    async def _handle_route(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked_requests += 1
+            self.blocked_bytes += self._known_size(request)
+            self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            await route.abort('blockedbyclient')
+        else:
+            self.allowed_requests += 1
+            await route.fallback()  # Let other routes (e.g. HAR replay) handle it
+
+    def _on_response(self, response):
+        try:
+            self.allowed_bytes += int(response.headers.get('content-length', 0))
+        except ValueError:
+            pass
+
+    def summary(self):
+        """Per-run counters as a dict"""
+        return {
+            'allowed_requests': self.allowed_requests,
+            'allowed_bytes': self.allowed_bytes,
+            'blocked_requests': self.blocked_requests,
+            'blocked_bytes': self.blocked_bytes,
+            'blocked_by_type': dict(self.blocked_by_type),
+        }
+
+    def print_summary(self):
+        print(f"🚫 Blocked {self.blocked_requests} requests "
+              f"({self.blocked_bytes / 1024 / 1024:.1f} MB known), by type: {self.blocked_by_type}")
+        print(f"📶 Allowed {self.allowed_requests} requests, {self.allowed_bytes / 1024 / 1024:.1f} MB transferred")
+
+
+class WaitEngine:
+    """Event-driven waits that end as soon as the content is there
+    
+    Each wait targets one condition - a selector, a network response or a quiet
+    DOM - and gives up after a timeout instead of sleeping a fixed amount.
+    """
+    DOM_STABLE_JS = """
+    ([quietMs, timeoutMs]) => new Promise(resolve => {
+        let quietTimer = null;
+        let capTimer = null;
+        const observer = new MutationObserver(() => arm());
+        const finish = (stable) => {
+            observer.disconnect();
+            clearTimeout(quietTimer);
+            clearTimeout(capTimer);
+            resolve(stable);
+        };
+        const arm = () => {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(() => finish(true), quietMs);
+        };
+        capTimer = setTimeout(() => finish(false), timeoutMs);
+        // Content only: attribute churn (animations, ticking timestamps) never goes quiet
+        observer.observe(document.documentElement, {
+            childList: true, subtree: true, characterData: true
+        });
+        arm();
+    })
+    """
+
+    def __init__(self, timeout_ms=10000, quiet_ms=500):
+        self.timeout_ms = timeout_ms
+        self.quiet_ms = quiet_ms
+
+    async def for_selector(self, page, selectors, timeout_ms=None, state='attached'):
+        """Wait until any of the selectors matches
+        
+        Returns:
+            bool: True if a selector matched before the timeout.
+        """
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        try:
+            await page.wait_for_selector(', '.join(selectors), state=state,
+                                         timeout=timeout_ms or self.timeout_ms)
+            return True
+        except Exception:
+            return False
+
+    async def after_response(self, page, url_pattern, action, timeout_ms=None):
+        """Run action() and wait for a response whose URL matches url_pattern
+        
+        The listener is armed before the action so a fast response isn't missed.
+        
+        Returns:
+            bool: True if a matching response arrived before the timeout.
+        """
+        pattern = re.compile(url_pattern)
+        waiter = asyncio.ensure_future(page.wait_for_event(
+            'response',
+            predicate=lambda response: bool(pattern.search(response.url)),
+            timeout=timeout_ms or self.timeout_ms,
+        ))
+        await asyncio.sleep(0)  # Let the listener register before acting
+        try:
+            await action()
+        except Exception:
+            waiter.cancel()
+            raise
+        try:
+            await waiter
+            return True
+        except Exception:
+            return False
+
+    async def for_dom_stable(self, page, quiet_ms=None, timeout_ms=None):
+        """Wait until the DOM has had no mutations for quiet_ms
+        
+        Returns:
+            bool: True if the DOM settled, False if the timeout hit first.
+        """
+        try:
+            return await page.evaluate(self.DOM_STABLE_JS, [quiet_ms or self.quiet_ms,
+                                                            timeout_ms or self.timeout_ms])
+        except Exception:
+            return False
+
+
+class PagePool:
+    """Warm tabs on one browser context, reset and handed out again instead of closed
+    
+    Released pages are navigated to about:blank and kept for the next caller, so most
+    acquires skip Chromium's tab creation and teardown. At most max_pages tabs are
+    open at once; acquire waits for a free one beyond that.
+    """
+
+    def __init__(self, new_page, max_pages=4):
+        self.new_page = new_page  # Coroutine function that opens a configured tab
+        self.max_pages = max(1, max_pages)
+        self.metrics = None  # Optional RunMetrics, set by the scraper
+        self.idle = []
+        self.open_pages = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self._slots = asyncio.Semaphore(self.max_pages)
+
+    async def acquire(self):
+        """A reset tab from the pool, or a new one while under the cap"""
+        await self._slots.acquire()
+        try:
+            while self.idle:
+                page = self.idle.pop()
+                if not page.is_closed():
+                    self.hits += 1
+                    self._count('page_pool_hits')
+                    return page
+                self.open_pages -= 1  # Closed behind the pool's back (crash, context gone)
+            page = await self.new_page()
+        except Exception:
+            self._slots.release()
+            raise
+        self.open_pages += 1
+        self.misses += 1
+        self._count('page_pool_misses')
+        if self.metrics:
+            self.metrics.set_gauge('page_pool_open', self.open_pages)
+        return page
+
+    async def release(self, page):
+        """Reset a tab to about:blank and keep it; tabs that fail to reset are closed"""
+        try:
+            if not page.is_closed():
+                try:
+                    await page.goto('about:blank')
+                    self.idle.append(page)
+                    return
+                except Exception:
+                    pass
+            self.discarded += 1
+            self.open_pages -= 1
+            try:
+                await page.close()
+            except Exception:
+                pass
+        finally:
+            self._slots.release()
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        """Borrow a tab for the duration of an async with block"""
+        page = await self.acquire()
+        try:
+            yield page
+        finally:
+            await self.release(page)
+
+    async def close(self):
+        """Close every idle tab; tabs still borrowed are closed with their context"""
+        idle, self.idle = self.idle, []
+        for page in idle:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self.open_pages -= len(idle)
+
+    def _count(self, name):
+        if self.metrics:
+            self.metrics.count(name)
+
+    def stats(self):
+        """Hit/miss counters as a dict"""
+        acquired = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / acquired, 3) if acquired else 0.0,
+            'discarded': self.discarded,
+            'open': self.open_pages,
+            'max_pages': self.max_pages,
+        }
+
+    def print_summary(self):
+        stats = self.stats()
+        print(f"🗂️ Page pool: {stats['hits']} reused / {stats['misses']} opened tabs "
+              f"({stats['hit_rate']:.0%} hit rate, {stats['discarded']} discarded, cap {stats['max_pages']})")
+
+
+class RateLimiter:
+    """Token bucket pacing profile visits, backing off when Instagram throttles
+    
+    acquire() hands out one token per profile at `rate` per second, shared by all
+    workers. A throttling signal (HTTP 429, a "Please wait a few minutes" page, a
+    redirect to login) halves the rate down to min_rate and pauses every worker for
+    a cooldown that doubles with each consecutive signal. Each successful profile
+    then adds ramp_step back to the rate, up to max_rate, and a run of successes
+    clears the cooldown strikes. A rate of 0 disables pacing entirely.
+    """
+
+    def __init__(self, per_minute=12, min_per_minute=2, max_per_minute=30, burst=1,
+                 cooldown_seconds=60, max_cooldown_seconds=900, recover_after=10):
+        self.enabled = per_minute > 0
+        self.rate = per_minute / 60
+        self.min_rate = min(min_per_minute, per_minute) / 60
+        self.max_rate = max(max_per_minute, per_minute) / 60
+        self.ramp_step = self.rate * 0.1  # Additive increase per successful profile
+        self.burst = max(1, burst)
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.recover_after = recover_after
+        self.tokens = float(self.burst)
+        self.last_refill = time.monotonic()
+        self.pause_until = 0.0
+        self.strikes = 0  # Consecutive throttling signals without a recovery in between
+        self.successes = 0
+        self.last_signal = 0.0
+        self.lock = asyncio.Lock()
+        self.metrics = None  # Optional RunMetrics for the current rate and signals
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            per_minute=float(os.getenv('RATE_PER_MINUTE', '12')),
+            min_per_minute=float(os.getenv('RATE_MIN_PER_MINUTE', '2')),
+            max_per_minute=float(os.getenv('RATE_MAX_PER_MINUTE', '30')),
+            burst=int(os.getenv('RATE_BURST', '1')),
+            cooldown_seconds=float(os.getenv('THROTTLE_COOLDOWN_SECONDS', '60')),
+            max_cooldown_seconds=float(os.getenv('THROTTLE_MAX_COOLDOWN_SECONDS', '900'))
+        )
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    async def acquire(self):
+        """Wait for the cooldown (if any) and a token"""
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        async with self.lock:  # Waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                if now < self.pause_until:
+                    await asyncio.sleep(self.pause_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        if self.metrics:
+            self.metrics.observe('rate_limit.wait', time.perf_counter() - started)
+
+    def on_throttle(self, reason):
+        """Back off after a throttling signal; repeats during a cooldown are only counted"""
+        self.last_signal = time.monotonic()
+        self.successes = 0
+        if self.metrics:
+            self.metrics.count('throttle_signals', reason=reason)
+        if not self.enabled or self.last_signal < self.pause_until:
+            return
+        self.strikes += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        cooldown = min(self.max_cooldown_seconds, self.cooldown_seconds * 2 ** (self.strikes - 1))
+        self.pause_until = self.last_signal + cooldown
+        self.tokens = 0.0
+        print(f"🐢 Throttled ({reason}) - pausing {cooldown:.0f}s, "
+              f"then {self.rate * 60:.1f} profiles/min")
+        self.report()
+
+    def on_success(self):
+        """Ramp the rate back up after a profile went through"""
+        if not self.enabled:
+            return
+        self.successes += 1
+        if self.successes >= self.recover_after:
+            self.strikes = 0
+        self.rate = min(self.max_rate, self.rate + self.ramp_step)
+        self.report()
+
+    def report(self):
+        if self.metrics:
+            self.metrics.set_gauge('rate_per_minute', round(self.rate * 60, 3))
+            self.metrics.set_gauge('throttle_strikes', self.strikes)
+
+
+class SelectorRegistry:
+    """Ranks fallback selectors per field by their recent success rate
+    
+    Every probe records a hit or miss and its latency. The score is an
+    exponentially weighted hit rate, so a selector that stops matching after a
+    markup change drops below the next candidate within a few probes. Stats are
+    kept in a small JSON file so the next run starts with the current ranking.
+    
+    Probes since the last save are also kept as per-selector deltas, which save
+    replays onto the file's current contents - so processes sharing the file
+    (shards, overlapping runs) add to each other's learning instead of overwriting it.
+    """
+    PRIOR_SCORE = 0.5  # Score of a selector that has never been probed
+
+    def __init__(self, path='selector_stats.json', decay=0.8):
+        self.path = path
+        self.decay = decay
+        self.stats = {}  # field -> selector -> {'hits', 'misses', 'total_ms', 'score'}
+        self.pending = {}  # field -> selector -> delta since the last save (see _fold)
+        self.metrics = None  # Optional RunMetrics counting probes per field
+        self.load()
+
+    def load(self):
+        self.stats = self._read()
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not load selector stats from {self.path}: {str(e)}")
+            return {}
+
+    def save(self):
+        """Merge this process's probes into the stats file and write it atomically"""
+        if not self.path or not self.pending:
+            return  # Nothing learned - leave the file to whoever did probe
+        try:
+            stats = self._read()
+            for field, selectors in self.pending.items():
+                for selector, delta in selectors.items():
+                    self._apply(stats, field, selector, delta)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.stats = stats
+            self.pending = {}
+        except Exception as e:
+            print(f"⚠️ Could not save selector stats to {self.path}: {str(e)}")
+
+    def record(self, field, selector, hit, elapsed_ms=0.0):
+        delta = {'hits': int(bool(hit)), 'misses': int(not hit), 'total_ms': float(elapsed_ms),
+                 'probes': 1, 'score_shift': (1 - self.decay) * (1.0 if hit else 0.0)}
+        self._apply(self.stats, field, selector, delta)
+        self._fold(field, selector, delta)
+        if self.metrics:
+            self.metrics.count('selector_probes', field=field, result='hit' if hit else 'miss')
+
+    def merge(self, pending):
+        """Take in probes another registry recorded (e.g. a shard's pending deltas)"""
+        for field, selectors in pending.items():
+            for selector, delta in selectors.items():
+                self._apply(self.stats, field, selector, delta)
+                self._fold(field, selector, delta)
+
+    def _apply(self, stats, field, selector, delta):
+        # n probes turn a score s into s * decay**n + score_shift
+        entry = stats.setdefault(field, {}).setdefault(
+            selector, {'hits': 0, 'misses': 0, 'total_ms': 0.0, 'score': self.PRIOR_SCORE}
+        )
+        entry['hits'] += delta['hits']
+        entry['misses'] += delta['misses']
+        entry['total_ms'] += delta['total_ms']
+        entry['score'] = entry['score'] * self.decay ** delta['probes'] + delta['score_shift']
+
+    def _fold(self, field, selector, delta):
+        # Append delta's probes after the ones already pending for this selector
+        current = self.pending.setdefault(field, {}).setdefault(
+            selector, {'hits': 0, 'misses': 0, 'total_ms': 0.0, 'probes': 0, 'score_shift': 0.0}
+        )
+        current['hits'] += delta['hits']
+        current['misses'] += delta['misses']
+        current['total_ms'] += delta['total_ms']
+        current['score_shift'] = current['score_shift'] * self.decay ** delta['probes'] + delta['score_shift']
+        current['probes'] += delta['probes']
+
+    def ordered(self, field, selectors):
+        """Selectors sorted by score, then mean latency, then their original position"""
+        field_stats = self.stats.get(field, {})
+
+        def rank(item):
+            index, selector = item
+            entry = field_stats.get(selector)
+            if not entry:
+                return (-self.PRIOR_SCORE, 0.0, index)
+            probes = entry['hits'] + entry['misses']
+            mean_ms = entry['total_ms'] / probes if probes else 0.0
+            return (-entry['score'], mean_ms, index)
+
+        return [selector for _, selector in sorted(enumerate(selectors), key=rank)]
+
+
+class ProfileSnapshot(HTMLParser):
+    """Offline parse of a captured profile page's HTML
+    
+    Collects the text of header spans/headings (like textContent in the DOM),
+    header images and meta tags in a single pass, and runs precompiled count
+    regexes over the raw HTML. Works the same on a live capture or a saved file.
+    """
+    FOLLOWERS_PATTERNS = [
+        re.compile(r'(\d+(?:,\d+)*(?:\.\d+)?[KMB]?)\s+followers', re.IGNORECASE),
+        re.compile(r'(\d+(?:,\d+)*(?:\.\d+)?[KMB]?)\s*followers', re.IGNORECASE),
+        re.compile(r'"follower_count":(\d+)'),  # JSON format
+    ]
+    POSTS_PATTERNS = [
+        re.compile(r'(\d+(?:,\d+)*)\s+posts', re.IGNORECASE),
+        re.compile(r'(\d+(?:,\d+)*)\s*posts', re.IGNORECASE),
+        re.compile(r'"media_count":(\d+)'),
+    ]
+    OG_TITLE_PATTERN = re.compile(r'^(.*?)\s*\(@[^)]+\)')
+    TEXT_BLOCK_TAGS = {'span', 'h1', 'h2'}
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'source', 'track', 'wbr'}
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.html = html or ''
+        self.meta = {}
+        self.header_texts = {}  # Ordered set of header text blocks
+        self.header_images = []
+        self.profile_picture = ''
+        self._stack = []
+        self._header_depth = None
+        self._block_depth = None
+        self._block_parts = []
+        self.feed(self.html)
+        self.close()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'meta':
+            key = attrs.get('property') or attrs.get('name')
+            if key and attrs.get('content'):
+                self.meta.setdefault(key, attrs['content'])
+            return
+        if tag == 'img':
+            src = attrs.get('src')
+            if src and 'profile picture' in (attrs.get('alt') or '').lower() and not self.profile_picture:
+                self.profile_picture = src
+            if src and self._header_depth is not None:
+                self.header_images.append(src)
+            return
+        if tag == 'br':
+            if self._block_depth is not None:
+                self._block_parts.append('\n')
+            return
+        if tag in self.VOID_TAGS:
+            return
+
+        self._stack.append(tag)
+        if tag == 'header' and self._header_depth is None:
+            self._header_depth = len(self._stack)
+        in_header = self._header_depth is not None
+        is_bio = attrs.get('data-testid') == 'user-bio'
+        if self._block_depth is None and ((in_header and tag in self.TEXT_BLOCK_TAGS) or is_bio):
+            self._block_depth = len(self._stack)
+            self._block_parts = []
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            return
+        while self._stack:
+            depth = len(self._stack)
+            open_tag = self._stack.pop()
+            if self._block_depth == depth:
+                text = ''.join(self._block_parts).strip()
+                if text:
+                    self.header_texts[text] = None
+                self._block_depth = None
+            if self._header_depth == depth:
+                self._header_depth = None
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._block_depth is not None:
+            self._block_parts.append(data)
+
+    def _first_match(self, patterns):
+        # Header text first (counts split across tags only line up there), then raw HTML
+        for source in ('\n'.join(self.header_texts), self.html):
+            for pattern in patterns:
+                match = pattern.search(source)
+                if match and match.group(1).lower() not in ('followers', 'following'):
+                    return match.group(1)
+        return ''
+
+    @property
+    def followers(self):
+        return self._first_match(self.FOLLOWERS_PATTERNS)
+
+    @property
+    def posts_count(self):
+        return self._first_match(self.POSTS_PATTERNS)
+
+    @property
+    def og_name(self):
+        match = self.OG_TITLE_PATTERN.search(self.meta.get('og:title', ''))
+        return match.group(1).strip() if match else ''
+
+    @property
+    def avatar(self):
+        if self.profile_picture:
+            return self.profile_picture
+        if self.header_images:
+            return self.header_images[0]
+        return self.meta.get('og:image', '')
+
+    @property
+    def texts(self):
+        return list(self.header_texts)
+
+
+class SheetWriter:
+    """Buffered, non-blocking writer for profile rows in a worksheet
+    
+    Every gspread call runs on a dedicated single-thread executor behind an async
+    interface, so sheet round trips never stall browser work on the event loop.
+    The header row is read once and cached as a header -> column map; missing
+    headers are appended in a single update. Row updates are buffered and sent
+    as one batch_update when enough rows are pending or enough time has passed
+    (checked on every write and by a timer, so a quiet stretch doesn't strand the
+    last rows), with consecutive cells of a row merged into one range. At most
+    max_inflight batches wait on the sheet thread; beyond that writers wait
+    (backpressure).
+    """
+
+    def __init__(self, worksheet, batch_rows=25, flush_seconds=30, max_inflight=2):
+        self.worksheet = worksheet
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.max_inflight = max_inflight
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sheets')
+        self.headers = None
+        self.column_index = {}  # Header -> 1-based column
+        self.pending = {}  # Row number -> {column: value}
+        self.inflight = set()
+        self.last_flush = time.monotonic()
+        self.timer = None  # Time-based flushes between writes, started with the first row
+        self.on_written = None  # Optional callback(row_numbers) after a batch is written
+        self.metrics = None  # Optional RunMetrics for batch timings and retries
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking gspread call on the sheet thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def load_headers(self):
+        """Read the header row once per run"""
+        if self.headers is None:
+            self.headers = await self.run(self.worksheet.row_values, 1)
+            self.column_index = {header: idx for idx, header in enumerate(self.headers, start=1)}
+        return self.headers
+
+    async def ensure_headers(self, needed_headers):
+        """Append every missing header in one sheet update"""
+        await self.load_headers()
+        missing = [header for header in dict.fromkeys(needed_headers) if header not in self.column_index]
+        if not missing:
+            return
+        for header in missing:
+            self.headers.append(header)
+            self.column_index[header] = len(self.headers)
+        await self.run(self.worksheet.update, 'A1', [list(self.headers)])
+        print(f"✅ Added {len(missing)} new columns to sheet")
+
+    async def write_row(self, row_num, values):
+        """Buffer {header: value} for a row, flushing when a threshold is reached"""
+        await self.ensure_headers(values.keys())
+        row = self.pending.setdefault(row_num, {})
+        for header, value in values.items():
+            row[self.column_index[header]] = value
+        if self.timer is None:
+            self.timer = asyncio.ensure_future(self._flush_periodically())
+        if self.should_flush():
+            await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(max(1, min(5, self.flush_seconds)))
+            if self.should_flush():
+                await self.flush()
+
+    def should_flush(self):
+        return (len(self.pending) >= self.batch_rows or
+                (self.pending and time.monotonic() - self.last_flush >= self.flush_seconds))
+
+    @staticmethod
+    def build_updates(pending):
+        """batch_update payload with each run of consecutive columns as one range"""
+        updates = []
+        for row_num, cells in sorted(pending.items()):
+            columns = sorted(cells)
+            run = [columns[0]]
+            for col_idx in columns[1:] + [None]:
+                if col_idx is not None and col_idx == run[-1] + 1:
+                    run.append(col_idx)
+                    continue
+                start = gspread.utils.rowcol_to_a1(row_num, run[0])
+                end = gspread.utils.rowcol_to_a1(row_num, run[-1])
+                updates.append({
+                    'range': start if start == end else f'{start}:{end}',
+                    'values': [[cells[col] for col in run]]
+                })
+                run = [col_idx]
+        return updates
+
+    async def flush(self, wait=False):
+        """Hand every buffered row to the sheet thread as one batch_update
+        
+        Args:
+            wait (bool): Also wait until every batch in flight has been written.
+        """
+        self.last_flush = time.monotonic()
+        # Backpressure: don't let unsent batches pile up behind a slow sheet
+        while self.pending and len(self.inflight) >= self.max_inflight:
+            await asyncio.wait(self.inflight, return_when=asyncio.FIRST_COMPLETED)
+        # Rows stay buffered until a batch is sent, so a cancelled wait loses nothing
+        if self.pending:
+            batch, self.pending = self.pending, {}
+            task = asyncio.ensure_future(self._send(batch))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+        if wait and self.inflight:
+            await asyncio.gather(*list(self.inflight))
+
+    async def _send(self, batch):
+        started = time.perf_counter()
+        try:
+            updates = self.build_updates(batch)
+            await self.run(self.worksheet.batch_update, updates)
+            if self.metrics:
+                self.metrics.observe('sheet.batch_write', time.perf_counter() - started)
+                self.metrics.count('sheet_rows_written', len(batch))
+            print(f"✅ Wrote {len(batch)} rows to sheet ({len(updates)} ranges)")
+            if self.on_written:
+                self.on_written(list(batch))
+        except Exception as e:
+            print(f"❌ Error writing {len(batch)} rows to sheet, will retry on next flush: {str(e)}")
+            if self.metrics:
+                self.metrics.observe('sheet.batch_write', time.perf_counter() - started, failed=True)
+                self.metrics.count('sheet_write_retries')
+            # Put the cells back without overwriting anything newer for the same row
+            for row_num, cells in batch.items():
+                row = self.pending.setdefault(row_num, {})
+                for col_idx, value in cells.items():
+                    row.setdefault(col_idx, value)
+
+    async def close(self):
+        """Flush everything and stop the timer and the sheet thread"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        await self.flush(wait=True)
+        if self.pending:
+            await self.flush(wait=True)  # One more try for a batch that failed
+        self.executor.shutdown(wait=True)
+
+
+class ScrapeJournal:
+    """Crash-safe SQLite journal of per-URL status for long sheet runs
+    
+    Each URL is pending, done or failed, with the time of its last change. A URL
+    only becomes done once its sheet row has actually been written, so a crash
+    never loses a scraped-but-unsent row; resuming skips done URLs and retries
+    pending and failed ones.
+    """
+
+    def __init__(self, path='scrape_journal.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' url TEXT PRIMARY KEY,'
+            ' row_num INTEGER,'
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' error TEXT,'
+            ' updated_at TEXT)'
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    def start_run(self, row_map=None, resume=False):
+        """Start a run, optionally registering its URLs right away
+        
+        Args:
+            row_map (dict): URL -> sheet row number (see register for streamed input).
+            resume (bool): Keep earlier statuses; otherwise every URL starts pending.
+        """
+        if not resume:
+            with self.conn:
+                self.conn.execute('DELETE FROM entries')
+        if row_map:
+            self.register(row_map.items())
+
+    def register(self, rows):
+        """Add (url, row_num) pairs as pending, keeping the status of known URLs"""
+        now = self._now()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO entries (url, row_num, status, updated_at) VALUES (?, ?, 'pending', ?) "
+                'ON CONFLICT(url) DO UPDATE SET row_num = excluded.row_num',
+                [(url, row_num, now) for url, row_num in rows]
+            )
+
+    def row_for(self, url):
+        """Sheet row registered for a URL, or None"""
+        row = self.conn.execute('SELECT row_num FROM entries WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    def done_among(self, urls):
+        """The subset of urls already marked done"""
+        urls = list(urls)
+        done = set()
+        for start in range(0, len(urls), 500):  # Stay under SQLite's parameter limit
+            chunk = urls[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            done.update(url for (url,) in self.conn.execute(
+                f"SELECT url FROM entries WHERE status = 'done' AND url IN ({placeholders})", chunk
+            ))
+        return done
+
+    def status_counts(self):
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM entries GROUP BY status').fetchall())
+
+    def mark_failed(self, url, error=''):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE entries SET status = 'failed', attempts = attempts + 1, error = ?, updated_at = ? WHERE url = ?",
+                (error, self._now(), url)
+            )
+
+    def mark_rows_done(self, row_nums):
+        """Mark the URLs of rows that were written to the sheet as done"""
+        now = self._now()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE entries SET status = 'done', attempts = attempts + 1, error = NULL, updated_at = ? WHERE row_num = ?",
+                [(now, row_num) for row_num in row_nums]
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def username_from_url(profile_url):
+    """Username from a profile URL ('' if none)
+    
+    Instagram URLs are matched on the domain; any other http(s) URL (such as a local
+    mock server) uses its first path segment.
+    """
+    text = (profile_url or '').strip()
+    match = re.search(r'instagram\.com/([^/?#]+)', text)
+    if match:
+        return match.group(1)
+    parsed = urlparse(text)
+    if parsed.scheme in ('http', 'https'):
+        return parsed.path.strip('/').split('/')[0]
+    return ''
+
+
+def normalize_username(profile_url):
+    """Lowercased username from a profile URL or @handle ('' if none)"""
+    text = (profile_url or '').strip()
+    username = username_from_url(text) or text.lstrip('@').strip('/')
+    return username.lower() if re.fullmatch(r'[\w.]+', username) else ''
+
+
+class ResultCache:
+    """Last scraped profile_data per normalized username, with its scrape time
+    
+    Lets a daily run skip profiles scraped within a TTL, and keeps the previous
+    result around for anything that wants to compare against it.
+    """
+
+    def __init__(self, path='scrape_cache.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)  # Shard processes share the file
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS profiles ('
+            ' username TEXT PRIMARY KEY,'
+            ' profile_json TEXT NOT NULL,'
+            ' scraped_at REAL NOT NULL)'
+        )
+        self.conn.commit()
+
+    def get(self, profile_url):
+        """Cached (profile_data, scraped_at) for a profile, or (None, None)"""
+        username = normalize_username(profile_url)
+        if not username:
+            return None, None
+        row = self.conn.execute(
+            'SELECT profile_json, scraped_at FROM profiles WHERE username = ?', (username,)
+        ).fetchone()
+        if not row:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def get_fresh(self, profile_url, ttl_seconds):
+        """Cached profile_data if it was scraped less than ttl_seconds ago"""
+        profile_data, scraped_at = self.get(profile_url)
+        if profile_data is None or time.time() - scraped_at >= ttl_seconds:
+            return None
+        return profile_data
+
+    def put(self, profile_url, profile_data):
+        username = normalize_username(profile_url) or normalize_username(profile_data.get('username'))
+        if not username:
+            return
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO profiles (username, profile_json, scraped_at) VALUES (?, ?, ?)',
+                (username, json.dumps(profile_data), time.time())
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+URL_COLUMNS = ['url', 'link', 'profile_url', 'instagram_url']  # Input columns holding profile URLs
+
+
+def find_url_column(headers, url_columns=URL_COLUMNS):
+    """Index of the first known URL column in a header row, or None"""
+    for name in url_columns:
+        if name in headers:
+            return headers.index(name)
+    return None
+
+
+def iter_excel_urls(path, url_columns=URL_COLUMNS):
+    """Yield profile URLs from the first sheet of an xlsx file, row by row
+    
+    The workbook is opened read-only, so rows are parsed as they are reached
+    instead of loading the whole file.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+        column = find_url_column(headers, url_columns)
+        if column is None:
+            raise ValueError(f"No URL column ({', '.join(url_columns)}) found, columns: {headers}")
+        for row in rows:
+            value = row[column] if column < len(row) else None
+            if value is not None and str(value).strip():
+                yield str(value).strip()
+    finally:
+        workbook.close()
+
+
+def iter_csv_urls(path, url_columns=URL_COLUMNS):
+    """Yield profile URLs from a CSV file, reading it in buffered chunks"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        headers = [value.strip() for value in next(reader, [])]
+        column = find_url_column(headers, url_columns)
+        if column is None:
+            raise ValueError(f"No URL column ({', '.join(url_columns)}) found, columns: {headers}")
+        for row in reader:
+            if column < len(row) and row[column].strip():
+                yield row[column].strip()
+
+
+async def iter_sheet_column(sheet_writer, col_idx, page_rows=1000, first_row=2):
+    """Yield pages of (row_num, value) for one sheet column, one API read per page
+    
+    Reads run on the sheet writer's thread. Paging stops at the worksheet's row
+    count, or at the first empty page when the row count isn't known.
+    """
+    worksheet = sheet_writer.worksheet
+    row_count = getattr(worksheet, 'row_count', None)
+    start = first_row
+    while row_count is None or start <= row_count:
+        end = start + page_rows - 1
+        range_name = (f'{gspread.utils.rowcol_to_a1(start, col_idx)}:'
+                      f'{gspread.utils.rowcol_to_a1(end, col_idx)}')
+        values = await sheet_writer.run(worksheet.get, range_name)
+        if not values and row_count is None:
+            return
+        yield [(start + offset, cells[0] if cells else '') for offset, cells in enumerate(values)]
+        start = end + 1
+
+
+class ResultPipeline:
+    """Streams scrape results through a normalizer into pluggable sinks
+    
+    Workers hand each finished profile to put(). A normalizer task turns it into a
+    record and fans it out to one bounded queue per sink, each drained by its own
+    task, so a slow sink only holds up the browser once its queue is full. Records
+    are dropped as soon as every sink has them; only running totals are kept.
+    
+    A sink is any object with async open(), write(record) and close(). A record is
+    {'index', 'url', 'profile', 'columns', 'scraped_at'}; index is the URL's position
+    in the input (records arrive in completion order), profile and columns are None
+    for a profile that failed.
+    """
+
+    def __init__(self, sinks, normalize, queue_size=100):
+        self.sinks = sinks
+        self.normalize = normalize
+        self.queue_size = queue_size
+        self.inbox = asyncio.Queue(maxsize=queue_size)
+        self.sink_queues = []
+        self.tasks = []
+        self.stats = {'scraped': 0, 'failed': 0, 'followers': 0, 'email': 0, 'phone': 0}
+
+    async def start(self):
+        """Open every sink and start the stage tasks"""
+        for sink in self.sinks:
+            await sink.open()
+        self.sink_queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.sinks]
+        self.tasks = [asyncio.ensure_future(self._drain(sink, sink_queue))
+                      for sink, sink_queue in zip(self.sinks, self.sink_queues)]
+        self.tasks.append(asyncio.ensure_future(self._run_normalizer()))
+
+    async def put(self, index, url, profile_data):
+        """on_result hook for scrape_profiles; waits only if the pipeline is backed up"""
+        await self.inbox.put((index, url, profile_data))
+
+    def count(self, profile_data):
+        if not profile_data:
+            self.stats['failed'] += 1
+            return
+        self.stats['scraped'] += 1
+        for field in ('followers', 'email', 'phone'):
+            if profile_data.get(field):
+                self.stats[field] += 1
+
+    async def _run_normalizer(self):
+        while True:
+            item = await self.inbox.get()
+            if item is None:
+                break
+            index, url, profile_data = item
+            try:
+                record = self.normalize(index, url, profile_data)
+            except Exception as e:
+                print(f"⚠️ Could not normalize result for {url}: {str(e)}")
+                continue
+            self.count(profile_data)
+            for sink_queue in self.sink_queues:
+                await sink_queue.put(record)
+        for sink_queue in self.sink_queues:
+            await sink_queue.put(None)
+
+    async def _drain(self, sink, sink_queue):
+        while True:
+            record = await sink_queue.get()
+            if record is None:
+                return
+            try:
+                await sink.write(record)
+            except Exception as e:
+                print(f"⚠️ {type(sink).__name__} could not write {record['url']}: {str(e)}")
+
+    async def close(self):
+        """Let every queued record reach the sinks, then close them"""
+        await self.inbox.put(None)
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for sink in self.sinks:
+            try:
+                await sink.close()
+            except Exception as e:
+                print(f"❌ Error closing {type(sink).__name__}: {str(e)}")
+
+
+class SheetSink:
+    """Writes each record into its row of the input sheet (batched by SheetWriter)"""
+
+    def __init__(self, scraper, row_for, journal=None):
+        self.scraper = scraper
+        self.row_for = row_for  # URL -> row number
+        self.journal = journal
+
+    async def open(self):
+        pass
+
+    async def write(self, record):
+        if record['profile']:
+            await self.scraper.update_sheet_row(record['profile'], self.row_for(record['url']))
+        elif self.journal:
+            self.journal.mark_failed(record['url'], 'scrape_profile returned no data')
+
+    async def close(self):
+        await self.scraper.flush_sheet()
+
+
+class JsonlSink:
+    """Appends every scraped profile (nested posts included) as one JSON line"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    async def open(self):
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    async def write(self, record):
+        if not record['profile']:
+            return
+        line = {'input_index': record['index'], 'url': record['url'], 'scraped_at': record['scraped_at'],
+                **record['profile']}
+        self.file.write(json.dumps(line, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    async def close(self):
+        if self.file:
+            self.file.close()
+
+
+class CsvSink:
+    """Appends every scraped profile as a row with the sheet's columns
+    
+    Rows are written as profiles finish; 'Input Index' gives back the input order.
+    """
+
+    def __init__(self, path, headers):
+        self.path = path
+        self.headers = ['Input Index', 'Profile URL', 'Scraped At'] + list(headers)
+        self.file = None
+        self.writer = None
+
+    async def open(self):
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, 'a', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.headers, restval='', extrasaction='ignore')
+        if write_header:
+            self.writer.writeheader()
+
+    async def write(self, record):
+        if not record['columns']:
+            return
+        self.writer.writerow({'Input Index': record['index'], 'Profile URL': record['url'],
+                              'Scraped At': record['scraped_at'], **record['columns']})
+        self.file.flush()
+
+    async def close(self):
+        if self.file:
+            self.file.close()
+
+
+class ParquetSink:
+    """Writes scraped profiles to a Parquet file, one row group per batch_rows rows
+    
+    Needs pyarrow. Count columns are stored as integers - display texts such as
+    "12,345" or "4.5M" go through parse_count - everything else as text.
+    Row groups are encoded on a worker thread so the event loop keeps running.
+    """
+    COUNT_COLUMN = re.compile(r'^(Input Index|Followers|Total Posts|Reel \d+ (Likes|Comments|Views))$')
+
+    def __init__(self, path, headers, parse_count, batch_rows=500):
+        self.path = path
+        self.headers = ['Input Index', 'Profile URL', 'Scraped At'] + list(headers)
+        self.parse_count = parse_count  # Text -> int, e.g. InstagramScraper.parse_count
+        self.batch_rows = batch_rows
+        self.rows = []
+        self.pa = None
+        self.pq = None
+        self.schema = None
+        self.writer = None
+
+    async def open(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError(f"Parquet output needs pyarrow ({str(e)})")
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.schema = pyarrow.schema([
+            (header, pyarrow.int64() if self.COUNT_COLUMN.match(header) else pyarrow.string())
+            for header in self.headers
+        ])
+        self.writer = self.pq.ParquetWriter(self.path, self.schema)
+
+    def _cell(self, header, value):
+        if value in (None, ''):
+            return None
+        if self.COUNT_COLUMN.match(header):
+            if isinstance(value, (int, float)):
+                return int(value)
+            count = self.parse_count(str(value))
+            # parse_count answers 0 for text without any number in it
+            return count if count or re.search(r'\d', str(value)) else None
+        return str(value)
+
+    async def write(self, record):
+        if not record['columns']:
+            return
+        values = {'Input Index': record['index'], 'Profile URL': record['url'],
+                  'Scraped At': record['scraped_at'], **record['columns']}
+        self.rows.append([self._cell(header, values.get(header)) for header in self.headers])
+        if len(self.rows) >= self.batch_rows:
+            await self.flush()
+
+    async def flush(self):
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        columns = list(zip(*rows))
+        table = self.pa.Table.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        )
+        await asyncio.get_running_loop().run_in_executor(None, self.writer.write_table, table)
+
+    async def close(self):
+        if self.writer:
+            await self.flush()
+            self.writer.close()
+
+
 class InstagramScraper:    
-    def __init__(self):
+    def __init__(self, connect_sheets=True):
+        """
+        Args:
+            connect_sheets (bool): Connect to Google Sheets right away. Offline tools pass
+                False and plug in their own worksheet.
+        """
+        # Timings, retries and selector probes of this run (JSONL + Prometheus snapshot)
+        self.metrics = RunMetrics.from_env()
+        
         # Initialize Google Sheets connection
         self.sheet_id = os.getenv('GOOGLE_SHEET_ID')
         self.sheet_name = os.getenv('GOOGLE_SHEET_NAME', 'Sheet1')
         self.credentials_file = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
         self.sheet_client = None
         self.worksheet = None
-        self.setup_google_sheets()
+        self.sheet_writer = None
+        if connect_sheets:
+            self.setup_google_sheets()
 
         # Existing initialization
-        self.browser = None
+        self.playwright = None  # One driver per scraper, stopped in cleanup
+        self.browser = None  # Set when attached over CDP or launched for a storage_state context
         self.context = None
+        self.owns_context = True  # False when the context belongs to a daemon browser
+        self.browser_visible = False
         self.page = None
-        self.scraped_data = []
+        self.result_stats = {}  # Totals of the last run_pipeline call
           # Updated selectors for Instagram reels
         self.POST_SELECTORS = [
             'a[href*="/reel/"]',  # Direct reel links
@@ -39,6 +1689,26 @@ class InstagramScraper:
         # JavaScript to expand truncated content
         self.EXPAND_CONTENT_JS = """
         (async () => {
+            // Resolves once the DOM has been quiet for quietMs, or after timeoutMs
+            const waitForQuiet = (quietMs, timeoutMs) => new Promise(resolve => {
+                let quietTimer = null;
+                let capTimer = null;
+                const observer = new MutationObserver(() => arm());
+                const finish = () => {
+                    observer.disconnect();
+                    clearTimeout(quietTimer);
+                    clearTimeout(capTimer);
+                    resolve();
+                };
+                const arm = () => {
+                    clearTimeout(quietTimer);
+                    quietTimer = setTimeout(finish, quietMs);
+                };
+                capTimer = setTimeout(finish, timeoutMs);
+                observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+                arm();
+            });
+
             // Find and click any "more" buttons in captions
             const moreButtonSelectors = [
                 'div._a9zs button',
@@ -46,6 +1716,7 @@ class InstagramScraper:
                 'button[role="button"]'
             ];
 
+            let clicked = false;
             for (const selector of moreButtonSelectors) {
                 const buttons = document.querySelectorAll(selector);
                 for (const button of buttons) {
@@ -53,14 +1724,15 @@ class InstagramScraper:
                     if (text.includes('more') || text.includes('...')) {
                         console.log('Found more button:', text);
                         button.click();
-                        // Wait longer after clicking to ensure expansion completes
-                        await new Promise(r => setTimeout(r, 1000));
+                        clicked = true;
                     }
                 }
             }
 
-            // Wait for possible dynamic content loading
-            await new Promise(r => setTimeout(r, 1500));
+            // Wait until the expanded caption has finished rendering
+            if (clicked) {
+                await waitForQuiet(300, 2500);
+            }
         })();
         """        
         self.MODAL_SELECTORS = {
@@ -118,134 +1790,640 @@ class InstagramScraper:
             'date': [
                 'time._aaqe[datetime]',
                 'time[datetime]'
+            ],
+            'likes_text': [
+                'section > div:nth-child(2) > div > div > span',  # Most common location
+                'section > div > div > span:has-text("likes")',   # Contains "likes" text
+                'section span:has-text("likes")',                # Generic likes text
+                'section div > span:has-text("likes")',          # Nested likes text
+            ],
+            'liked_by': [
+                'section span:has-text("Liked by")',
+                'section div:has-text("Liked by")',
+                'section span:has-text("and others")',
             ]
         }
+
+        # Profile header selectors for name and bio text
+        self.BIO_SELECTORS = [
+            'section header div:last-child div span',
+            'section header div div:last-child span',
+            'div[data-testid="user-bio"]',
+            'section header div:nth-child(2) div:nth-child(3) div span',
+            'section header div:nth-child(2) div:last-child div span',
+            'section div div div:last-child div span:not([aria-label])',
+            'section header > div:nth-child(2) > div:last-child span',
+            'h1[dir="auto"]'
+        ]
+
+        # Patterns a candidate must match to count as a hit for each reel field
+        self.REEL_FIELD_ACCEPT = {
+            'caption': r'\S',
+            'comments': r'\d',
+            'likes_text': r'^(?=[\s\S]*\d)(?=[\s\S]*likes)',
+            'liked_by': r'liked by',
+            'likes': r'\d+.*likes?',
+        }
+        # Rendered grid reels in DOM order (the grid's own row order) plus one scroll step
+        self.GRID_COLLECT_JS = """
+        (args) => {
+            let anchors = [];
+            for (const selector of args.postSelectors) {
+                try {
+                    anchors = Array.from(document.querySelectorAll(selector));
+                } catch (e) {
+                    anchors = [];  // Selector not supported by this browser
+                }
+                if (anchors.length) {
+                    break;
+                }
+            }
+
+            const skip = new Set(args.skip);
+            const items = [];
+            for (const anchor of anchors) {
+                const href = anchor.getAttribute('href');
+                if (!href || !(href.includes('/reel/') || href.includes('/p/')) || skip.has(href)) {
+                    continue;
+                }
+                skip.add(href);
+
+                // Grid view count: ranked selectors first, each reported as [selector, hit, elapsedMs]
+                const probes = [];
+                let views = null;
+                for (const selector of args.viewSelectors) {
+                    const started = performance.now();
+                    let element = null;
+                    try {
+                        element = anchor.querySelector(selector);
+                    } catch (e) {}
+                    const text = element ? (element.textContent || '').trim() : '';
+                    const hit = /\\d/.test(text) && /view|k|m/i.test(text);
+                    probes.push([selector, hit, performance.now() - started]);
+                    if (hit) {
+                        views = text;
+                        break;
+                    }
+                }
+                if (views === null) {
+                    for (const span of anchor.querySelectorAll('span')) {
+                        const text = span.textContent || '';
+                        if (text.includes('K') || text.includes('M') || text.includes('view')) {
+                            views = text;
+                            break;
+                        }
+                    }
+                }
+                items.push({href, views, probes});
+                if (items.length >= args.limit) {
+                    break;
+                }
+            }
+
+            const scroller = document.scrollingElement || document.documentElement;
+            const atEnd = scroller.scrollTop + window.innerHeight >= scroller.scrollHeight - 2;
+            if (items.length < args.limit && !atEnd) {
+                window.scrollBy(0, Math.round(window.innerHeight * args.scroll));
+            }
+            return {items, atEnd};
+        }
+        """
+        self.REEL_EXTRACT_JS = """
+        (table) => {
+            // querySelectorAll plus Playwright's trailing :has-text("...") extension
+            const query = (selector) => {
+                const match = selector.match(/^(.*):has-text\\("([^"]*)"\\)$/);
+                try {
+                    if (!match) {
+                        return Array.from(document.querySelectorAll(selector));
+                    }
+                    const needle = match[2].toLowerCase();
+                    return Array.from(document.querySelectorAll(match[1] || '*'))
+                        .filter(el => (el.textContent || '').toLowerCase().includes(needle));
+                } catch (e) {
+                    return [];  // Selector not supported by this browser
+                }
+            };
+
+            // Every probe is reported back as [field, selector, hit, elapsedMs]
+            const result = {probes: []};
+            const probeFirst = (field, selectors, read, accept) => {
+                result[field] = [];
+                for (const selector of selectors) {
+                    const started = performance.now();
+                    const element = query(selector)[0];
+                    const value = element ? read(element) : null;
+                    const hit = Boolean(value) && accept.test(value);
+                    result.probes.push([field, selector, hit, performance.now() - started]);
+                    if (hit) {
+                        result[field].push(value);
+                        break;  // Selectors are ranked, so the first hit wins
+                    }
+                }
+            };
+
+            // Fields listed in a spec's 'unless' already answered what it is a fallback for
+            const answered = (fields) => (fields || []).some(field => (result[field] || []).length > 0);
+
+            for (const [field, spec] of Object.entries(table.first)) {
+                if (answered(spec.unless)) {
+                    result[field] = [];
+                    continue;
+                }
+                probeFirst(field, spec.selectors, el => el.textContent, new RegExp(spec.accept, 'i'));
+            }
+            for (const [field, spec] of Object.entries(table.attribute)) {
+                probeFirst(field, spec.selectors, el => el.getAttribute(spec.attribute), /\\S/);
+            }
+            // Last resort: every likes-looking text, only when the ranked selectors found none
+            for (const [field, spec] of Object.entries(table.all)) {
+                if (answered(spec.unless)) {
+                    continue;
+                }
+                const seen = new Set();
+                result[field] = result[field] || [];
+                for (const selector of spec.selectors) {
+                    for (const element of query(selector)) {
+                        const text = (element.textContent || '').trim();
+                        if (text && !seen.has(text) && /\\d+.*likes?/i.test(text)) {
+                            seen.add(text);
+                            result[field].push(text);
+                        }
+                    }
+                }
+            }
+            return result;
+        }
+        """
         self.user_data_dir = './user_data'  # Add this line
+        self.base_url = os.getenv('INSTAGRAM_BASE_URL', 'https://www.instagram.com').rstrip('/')
+
+        # Freshness cache: profiles scraped within cache_ttl seconds are not re-scraped
+        self.cache = ResultCache(os.getenv('CACHE_FILE', 'scrape_cache.db'))
+        self.cache_ttl = float(os.getenv('CACHE_TTL_HOURS', '0')) * 3600
+        self.force_refresh = False  # Ignore the cache and scrape everything
+        self.stale_only = False  # Leave fresh rows untouched instead of re-writing cached data
+
+        # Delta mode: only open reels that are new or whose grid views moved past the threshold
+        self.delta_mode = env_flag('DELTA_MODE', False)
+        self.delta_threshold = float(os.getenv('DELTA_THRESHOLD', '0.05'))  # Fraction of last views
+
+        # Extra result files (.jsonl, .csv, .parquet) written as profiles finish
+        self.output_paths = [path.strip() for path in os.getenv('OUTPUT_FILES', '').split(',') if path.strip()]
+        self.pipeline_queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))
+        self.sheet_read_rows = int(os.getenv('SHEET_READ_ROWS', '1000'))  # Rows per paged sheet read
+        
+        # Per-URL status journal used to resume interrupted sheet runs
+        self.journal_file = os.getenv('JOURNAL_FILE', 'scrape_journal.db')
+
+        # Warm browser daemon: the daemon listens on debug_port, runs attach via cdp_url
+        self.debug_port = None
+        self.cdp_url = os.getenv('BROWSER_CDP_URL', '')
+        self.daemon_check_seconds = float(os.getenv('DAEMON_CHECK_MINUTES', '30')) * 60
+        
+        # Headless workers: `--login` exports the session once, runs start small contexts from it
+        self.storage_state_path = os.getenv('STORAGE_STATE_FILE', 'storage_state.json')
+        self.use_storage_state = env_flag('USE_STORAGE_STATE', True)  # Only once the file exists
+        self.refresh_storage_state = True  # Re-export rotated cookies when the run closes
+        self.from_storage_state = False
+        width, height = os.getenv('WORKER_VIEWPORT', '360x640').lower().split('x')
+        self.worker_viewport = {'width': int(width), 'height': int(height)}
+        self.worker_scale_factor = float(os.getenv('WORKER_SCALE_FACTOR', '1'))
+        
+        # Record traffic to / replay traffic from a HAR file
+        self.har_record_path = os.getenv('HAR_RECORD', '')
+        self.har_replay_path = os.getenv('HAR_REPLAY', '')
+
+        # Optional directory of captured profile HTML for offline re-parsing
+        self.snapshot_dir = os.getenv('SNAPSHOT_DIR', '')
+
+        # Fallback selectors are tried in order of recent success, remembered across runs
+        self.selectors = SelectorRegistry(os.getenv('SELECTOR_STATS_FILE', 'selector_stats.json'))
+        self.selectors.metrics = self.metrics
+
+        # Waits end on a selector, a response or a quiet DOM instead of fixed sleeps
+        self.waits = WaitEngine(
+            timeout_ms=int(os.getenv('WAIT_TIMEOUT_MS', '10000')),
+            quiet_ms=int(os.getenv('DOM_QUIET_MS', '500'))
+        )
+        
+        # Session validation: sessionid cookie, plus one authenticated API call if enabled
+        self.session_probe = env_flag('SESSION_PROBE', True)
+        self.IG_APP_ID = '936619743392459'  # Instagram web app id expected by its API
+
+        # Concurrency settings - number of profile pages scraped side by side
+        self.max_workers = max(1, int(os.getenv('SCRAPER_WORKERS', '1')))
+        
+        # Pacing between profiles, adapting to throttling signals
+        self.rate_limiter = RateLimiter.from_env()
+        self.rate_limiter.metrics = self.metrics
+        self.rate_limiter.report()
+        self.profile_retries = int(os.getenv('PROFILE_RETRIES', '2'))  # Requeues of a throttled profile
+        self.THROTTLE_TEXTS = [
+            'Please wait a few minutes before you try again',
+            'Try Again Later',
+        ]
+        self.LOGIN_REDIRECT_PATHS = ['/accounts/login', '/challenge/', '/accounts/suspended']
+        # Visible text of Instagram's error dialogs, plus the page itself only when no
+        # profile or reel content rendered - bios and captions may say "try again later"
+        self.THROTTLE_TEXT_JS = """
+        () => {
+            const texts = Array.from(document.querySelectorAll('div[role="dialog"], div[role="alert"]'))
+                .map(el => el.innerText || '');
+            const rendered = document.querySelector('header h2, header section, main h2, article, time[datetime]');
+            if (!rendered && document.body) {
+                texts.push(document.body.innerText.slice(0, 5000));
+            }
+            return texts.join('\\n');
+        }
+        """
+        self.reel_concurrency = max(1, int(os.getenv('REEL_CONCURRENCY', '3')))  # Reel tabs open at once per profile
+        self.page_pool = None  # Reel tabs, created with the browser context
+        self.page_pool_size = int(os.getenv('PAGE_POOL_SIZE', '0'))  # 0: max_workers * reel_concurrency
+        self.top_reels = max(1, int(os.getenv('TOP_REELS', '3')))  # Reels taken from the top of each grid
+        self.grid_scroll_fraction = 0.9  # Viewport heights scrolled per grid pass
+        self.grid_stall_passes = 3  # Passes without new reels before the grid counts as exhausted
+        
+        # Sharding - separate processes, each with its own browser and a copy of the session
+        self.shards = max(1, int(os.getenv('SCRAPER_SHARDS', '1')))
+        self.shard_dir = os.getenv('SHARD_DIR', './user_data_shards')
+
+        # Read metrics from Instagram's own JSON responses, falling back to the DOM
+        self.network_extract = env_flag('NETWORK_EXTRACT', True)
+
+        # Lean pages: skip images/video/fonts/trackers and render at 1x
+        self.lean_pages = env_flag('LEAN_PAGES', True)
+        self.request_filter = RequestFilter.from_env() if self.lean_pages else None
+        self.device_scale_factor = float(os.getenv('DEVICE_SCALE_FACTOR', '1' if self.lean_pages else '3'))
+
+        # Headers sent by every scraping tab
+        self.EXTRA_HEADERS = {
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        }
     
+    @timed_stage('setup_browser')
     async def setup_browser(self, force_visible=False):
-        """Initialize browser with mobile emulation and persistent session
+        """Start the run's single browser context, or attach to a warm daemon browser
+        
+        One Playwright driver is started per scraper and reused; calling this again
+        only relaunches when a visible window is needed and the current one is headless.
         
         Args:
             force_visible (bool): If True, shows the browser UI. Otherwise runs headless.
         """
-        playwright = await async_playwright().start()
+        if self.context:
+            if not force_visible or self.browser_visible or not self.owns_context:
+                return
+            await self.close_browser()  # Relaunch the same profile with a window
+        
+        if not self.playwright:
+            self.playwright = await async_playwright().start()
         
-        # Launch browser with persistent context
-        self.context = await playwright.chromium.launch_persistent_context(
-            user_data_dir=self.user_data_dir,
-            headless=not force_visible,  # Run headless unless force_visible is True
-            args=[
+        if self.cdp_url:
+            # Attach to the daemon's logged-in browser instead of launching one
+            self.browser = await self.playwright.chromium.connect_over_cdp(self.cdp_url)
+            self.context = self.browser.contexts[0] if self.browser.contexts else await self.browser.new_context()
+            self.owns_context = False
+            self.browser_visible = False
+            if self.har_record_path:
+                print("⚠️ HAR recording is not available when attached to a daemon browser")
+            print(f"🔌 Attached to warm browser at {self.cdp_url}")
+        else:
+            # Record this run's traffic to a HAR file if requested
+            har_options = {}
+            if self.har_record_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.har_record_path)), exist_ok=True)
+                har_options = {'record_har_path': self.har_record_path, 'record_har_mode': 'full'}
+            
+            args = [
                 '--no-sandbox',
                 '--disable-blink-features=AutomationControlled',
                 '--disable-web-security',
                 '--disable-features=VizDisplayCompositor'
-            ],
-            # Mobile device settings
-            viewport={'width': 390, 'height': 844},
-            user_agent='Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0.3 Mobile/15E148 Safari/604.1',
-            device_scale_factor=3,
-            is_mobile=True,
-            has_touch=True
-        )
+            ]
+            user_agent = 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0.3 Mobile/15E148 Safari/604.1'
+            
+            if not force_visible and not self.debug_port and self.storage_state_ready():
+                # Headless worker: a throwaway context carrying the exported login, no profile on disk
+                self.browser = await self.playwright.chromium.launch(headless=True, args=args)
+                self.context = await self.browser.new_context(
+                    storage_state=self.storage_state_path,
+                    viewport=self.worker_viewport,
+                    user_agent=user_agent,
+                    device_scale_factor=self.worker_scale_factor,
+                    is_mobile=True,
+                    has_touch=True,
+                    **har_options
+                )
+                self.from_storage_state = True
+                print(f"🪶 Headless worker context from {self.storage_state_path}")
+            else:
+                if self.debug_port:
+                    args.append(f'--remote-debugging-port={self.debug_port}')  # Daemon mode
+                
+                # Launch browser with persistent context
+                self.context = await self.playwright.chromium.launch_persistent_context(
+                    user_data_dir=self.user_data_dir,
+                    headless=not force_visible,  # Run headless unless force_visible is True
+                    args=args,
+                    # Mobile device settings
+                    viewport={'width': 390, 'height': 844},
+                    user_agent=user_agent,
+                    device_scale_factor=self.device_scale_factor,
+                    is_mobile=True,
+                    has_touch=True,
+                    **har_options
+                )
+                self.from_storage_state = False
+            self.owns_context = True
+            self.browser_visible = force_visible
         
-        # Create page from persistent context
-        self.page = await self.context.new_page()
+        # Serve every request from a recording instead of the network
+        if self.har_replay_path:
+            await self.context.route_from_har(self.har_replay_path, not_found='abort')
+            print(f"📼 Replaying traffic from {self.har_replay_path}")
         
-        # Add extra headers
-        await self.page.set_extra_http_headers({
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        # Filter requests before any page is opened (runs before the HAR route)
+        if self.request_filter:
+            await self.request_filter.install(self.context)
+        
+        # API calls answered with 429 slow the whole run down
+        self.context.on('response', self.watch_throttling)
+        
+        # Create the main scraping tab
+        self.page = await self.new_scrape_page()
+        self.page_pool = PagePool(self.new_scrape_page,
+                                  self.page_pool_size or self.max_workers * self.reel_concurrency)
+        self.page_pool.metrics = self.metrics
         
         print("✅ Browser setup complete")
+
+    async def close_browser(self):
+        """Close this run's context - or detach from a daemon's - keeping the Playwright driver"""
+        if not self.context:
+            return
+        try:
+            if self.page_pool:
+                await self.page_pool.close()
+            if self.owns_context:
+                if self.from_storage_state and self.refresh_storage_state:
+                    # Keep cookies Instagram rotated during the run, but never export a logged-out session
+                    if (await self.validate_session(probe=False))[0]:
+                        await self.save_storage_state()
+                await self.context.close()
+                if self.browser:
+                    await self.browser.close()  # The browser launched for a storage_state context
+            else:
+                # The daemon's browser keeps running; only undo what this run added to it
+                if self.page:
+                    await self.page.close()
+                self.context.remove_listener('response', self.watch_throttling)
+                try:
+                    await self.context.unroute_all(behavior='ignoreErrors')
+                except Exception:
+                    pass  # Older Playwright - routes go away with the connection anyway
+                await self.browser.close()  # Disconnects from a CDP browser
+        except Exception as e:
+            print(f"⚠️ Error closing browser: {str(e)}")
+        finally:
+            self.context = None
+            self.browser = None
+            self.page = None
+            self.page_pool = None
+            self.from_storage_state = False
+
+    async def stop_browser(self):
+        """Close the browser and stop the Playwright driver"""
+        await self.close_browser()
+        if self.playwright:
+            try:
+                await self.playwright.stop()
+            except Exception as e:
+                print(f"⚠️ Error stopping Playwright: {str(e)}")
+            self.playwright = None
+
+    def storage_state_ready(self):
+        """Whether runs should start headless worker contexts from an exported login"""
+        return bool(self.use_storage_state and self.storage_state_path
+                    and os.path.exists(self.storage_state_path))
+
+    async def save_storage_state(self):
+        """Export the context's cookies and local storage to storage_state_path
+        
+        Written atomically and readable by the owner only - the file is a logged-in session.
+        """
+        state = await self.context.storage_state()
+        directory = os.path.dirname(os.path.abspath(self.storage_state_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.storage_state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.storage_state_path)
+
+    async def export_login(self):
+        """One-time login step: log in with the persistent profile and export its storage_state
+        
+        Later runs then start headless worker contexts from the exported file and never
+        need a display.
+        """
+        self.use_storage_state = False  # Log in with the real profile, not an older export
+        if not await self.login_instagram():
+            return False
+        await self.save_storage_state()
+        print(f"💾 Session exported to {self.storage_state_path} - scraping runs now start headless from it")
+        return True
+
+    async def new_scrape_page(self):
+        """Open a new tab on the shared context with the scraper's extra headers"""
+        page = await self.context.new_page()
+        await page.set_extra_http_headers(self.EXTRA_HEADERS)
+        return page
     
     async def login_instagram(self):
-        """Check login status and handle first-time login"""
+        """Check login status and handle first-time login
+        
+        The saved session is validated from cookies without loading any page; the
+        visible browser is only opened when that session is actually invalid.
+        """
         try:
             print("🔄 Checking Instagram login status...")
-              # Always use visible browser for better compatibility
-            await self.setup_browser(force_visible=True)
-            await self.page.goto('https://www.instagram.com/', wait_until='networkidle')
+            await self.setup_browser()  # No-op when the browser is already running
             
             # Check if already logged in 
-            logged_in = await self.check_login_status()
-            
-            if logged_in:
+            if await self.check_login_status():
                 print("✅ Already logged in with saved session!")
                 return True
-                
-            print("📱 Please log in manually...")
-              # Give time for the page to fully load
-            await asyncio.sleep(2)
             
-            # Already in visible mode, so just continue
+            if self.cdp_url:
+                print("❌ The daemon browser is not logged in - log in again in its window")
+                return False
+            
+            if self.from_storage_state:
+                print(f"❌ The session in {self.storage_state_path} is logged out - run `python reels.py --login` again")
+                return False
             
+            # Manual login needs a window - relaunch the same profile visibly
+            await self.setup_browser(force_visible=True)
+            await self.page.goto(f'{self.base_url}/accounts/login/', wait_until='domcontentloaded')
             print("📱 Please log in manually in the browser window...")
-            print("⏳ Waiting for login completion (browser will auto-close once logged in)...")
+            print("⏳ Waiting for login completion...")
             
-            # Wait for successful login
-            while not logged_in:
+            # Instagram sets the session cookie as soon as the login goes through
+            while not (await self.validate_session(probe=False))[0]:
                 await asyncio.sleep(2)
-                logged_in = await self.check_login_status()
-                
+            
             print("✅ Manual login successful!")
             print("💾 Your login session has been saved for future use")
-              # Keep browser visible for better compatibility
             return True
                 
         except Exception as e:
             print(f"❌ Error during login process: {str(e)}")
             return False
             
+    @timed_stage('check_login_status')
     async def check_login_status(self):
-        """Check if we're logged into Instagram by looking for multiple indicators"""
+        """Check if we're logged into Instagram from the session cookie (see validate_session)"""
+        valid, reason = await self.validate_session()
+        if not valid:
+            print(f"⚠️ Not logged in: {reason}")
+        return valid
+
+    async def validate_session(self, probe=None):
+        """Decide from the context's cookies whether the saved session is logged in
+        
+        Args:
+            probe (bool): Also make one lightweight authenticated API request to
+                confirm it. Defaults to self.session_probe.
+        
+        Returns:
+            tuple: (valid, reason). A probe that fails for other reasons than being
+                logged out (network error, 5xx) leaves the cookie's verdict standing.
+        """
+        probe = self.session_probe if probe is None else probe
         try:
-            # Wait briefly for page content
-            await asyncio.sleep(2)
-            
-            # Check for login-required elements
-            login_elements = await self.page.query_selector_all('form[action*="login"]')
-            if login_elements:
-                print("⚠️ Login form detected - not logged in")
-                return False
-              # Check for home feed indicators
-            home_indicators = [
-                'a[href*="/p/"]',  # Post links
-                'button[aria-label*="Like"]',  # Like buttons
-                'svg[aria-label="Home"]',  # Home icon
-                'a[href="/"]'  # Home link
-            ]
-            
-            for selector in home_indicators:
-                try:
-                    element = await self.page.query_selector(selector)
-                    if element:
-                        return True
-                except Exception:
-                    continue
-            
-            # Additional check - look for logged-in user avatar
-            avatar = await self.page.query_selector('img[data-testid="user-avatar"]')
-            if avatar:
-                return True
-                
-            print("⚠️ No logged-in indicators found")
-            return False
-            
+            cookies = await self.context.cookies(self.base_url)
         except Exception as e:
-            print(f"❌ Error checking login status: {str(e)}")
-            return False
-    async def scrape_profile(self, profile_url):
-        """Scrape individual Instagram profile"""
+            return False, f'could not read cookies ({str(e)})'
+        session = next((cookie for cookie in cookies if cookie['name'] == 'sessionid' and cookie.get('value')), None)
+        if not session:
+            return False, 'no sessionid cookie'
+        expires = session.get('expires', -1)
+        if expires not in (None, -1) and expires < time.time() + 60:
+            return False, 'sessionid cookie has expired'
+        if not probe:
+            return True, 'sessionid cookie present'
+        
+        try:
+            response = await self.context.request.get(
+                f'{self.base_url}/api/v1/accounts/current_user/?edit=true',
+                headers={'X-IG-App-ID': self.IG_APP_ID, 'X-Requested-With': 'XMLHttpRequest'},
+                max_redirects=0,
+                timeout=10000
+            )
+        except Exception as e:
+            return True, f'sessionid cookie present, probe failed ({str(e)})'
+        if response.status in (301, 302, 401, 403):
+            return False, f'authenticated request answered {response.status}'
+        if response.status == 429:
+            self.rate_limiter.on_throttle('http_429')
+        if response.status == 200:
+            try:
+                payload = await response.json()
+            except Exception:
+                payload = {}
+            if isinstance(payload, dict) and (payload.get('require_login') or payload.get('message') == 'login_required'):
+                return False, 'authenticated request asked for login'
+            return True, 'authenticated request succeeded'
+        return True, f'sessionid cookie present, probe answered {response.status}'
+
+    async def run_daemon(self, port):
+        """Keep a logged-in browser running for scraper runs to attach to over CDP
+        
+        Runs until interrupted, re-checking the session every daemon_check_seconds.
+        """
+        self.cdp_url = ''  # The daemon owns its browser
+        self.use_storage_state = False  # ...on the persistent profile, so it can log in again
+        self.debug_port = port
+        await self.setup_browser()
+        if not await self.login_instagram():
+            print("❌ Login failed - daemon not started")
+            return
+        print(f"🔥 Warm browser ready - run the scraper with --cdp http://127.0.0.1:{port} (Ctrl+C to stop)")
+        while True:
+            await asyncio.sleep(self.daemon_check_seconds)
+            try:
+                if await self.check_login_status():
+                    print(f"✅ Daemon session still logged in ({datetime.now().strftime('%H:%M')})")
+                else:
+                    # The daemon runs headless, so relaunch its profile with a window (same
+                    # debugging port) for the manual login; attached runs have to reconnect
+                    print("⚠️ Daemon session looks logged out - reopening its browser to log in again")
+                    if await self.login_instagram():
+                        print(f"🔥 Warm browser ready again at http://127.0.0.1:{port}")
+            except Exception as e:
+                print(f"⚠️ Daemon session check failed: {str(e)}")
+
+    def watch_throttling(self, response):
+        """Context response listener: any 429 counts as a throttling signal"""
+        if response.status == 429:
+            self.rate_limiter.on_throttle('http_429')
+
+    async def detect_throttle(self, page, response):
+        """Why a freshly loaded page looks throttled, or None if it doesn't
+        
+        Args:
+            page: Page that was just navigated.
+            response: Response returned by page.goto (may be None).
+        
+        Returns:
+            str: 'http_429', 'login_redirect' or 'wait_page', or None.
+        """
+        if response is not None and response.status == 429:
+            return 'http_429'
+        path = urlparse(page.url).path
+        if any(path.startswith(prefix) for prefix in self.LOGIN_REDIRECT_PATHS):
+            return 'login_redirect'
+        try:
+            body_text = await page.evaluate(self.THROTTLE_TEXT_JS)
+            if any(text.lower() in body_text.lower() for text in self.THROTTLE_TEXTS):
+                return 'wait_page'
+        except Exception:
+            pass  # Page went away mid-check - nothing to report
+        return None
+
+    async def scrape_profile(self, profile_url, page=None, record=None):
+        """Scrape individual Instagram profile
+        
+        Args:
+            profile_url (str): Instagram profile URL to scrape.
+            page: Tab to scrape on. Defaults to the scraper's main page.
+            record (dict): Optional metrics record of this profile (see RunMetrics.profile);
+                'throttled' is set to the reason when Instagram throttled this visit.
+        """
+        page = page or self.page
+        capture = None
+        if self.network_extract:
+            # Listen before navigating so the profile's API responses are captured
+            capture = ResponseCapture()
+            capture.attach(page)
         try:
             print(f"🔄 Scraping: {profile_url}")
             
             # Navigate to profile and wait for load
-            await self.page.goto(profile_url, wait_until='networkidle')
-            await asyncio.sleep(3)
+            started = time.perf_counter()
+            response = await page.goto(profile_url, wait_until='networkidle')
+            reason = await self.detect_throttle(page, response)
+            if reason:
+                self.rate_limiter.on_throttle(reason)
+                if record is not None:
+                    record['throttled'] = reason
+                print(f"🐢 Instagram is throttling ({reason}), skipping {profile_url} for now")
+                return None
             
             # Initialize data structure
             profile_data = {
@@ -262,251 +2440,495 @@ class InstagramScraper:
             }
             
             # Extract username from URL
-            username_match = re.search(r'instagram\.com/([^/?]+)', profile_url)
-            if username_match:
-                profile_data['username'] = username_match.group(1)
+            profile_data['username'] = username_from_url(profile_url)
             
-            # Wait for profile elements to load
-            try:
-                await self.page.wait_for_selector('h2', timeout=10000)
-            except:
+            # Wait for profile elements to load and stop changing
+            if not await self.waits.for_selector(page, ['h2', 'header section']):
                 print(f"⚠️ Profile elements not loaded for {profile_url}")
-            
-            # Extract followers count - Fixed regex to capture full number
-            try:
-                # Get the full page content to search for followers
-                page_content = await self.page.content()
-                
-                # Multiple patterns to match followers count
-                followers_patterns = [
-                    r'(\d+(?:,\d+)*(?:\.\d+)?[KMB]?)\s+followers',  
-                    r'(\d+(?:,\d+)*(?:\.\d+)?[KMB]?)\s*followers',  
-                    r'"follower_count":(\d+)',  # JSON format
-                ]
-                
-                for pattern in followers_patterns:
-                    followers_match = re.search(pattern, page_content, re.IGNORECASE)
-                    if followers_match:
-                        followers_count = followers_match.group(1)
-                        # Clean up the count
-                        if followers_count and not followers_count.lower() in ['followers', 'following']:
-                            profile_data['followers'] = followers_count
-                            print(f"✅ Found followers: {followers_count}")
-                            break
-                        
-            except Exception as e:
-                print(f"⚠️ Could not extract followers: {str(e)}")
-            
-            # Extract posts count
+            await self.waits.for_dom_stable(page, timeout_ms=3000)
+            self.metrics.observe('profile.navigate', time.perf_counter() - started)
+            started = time.perf_counter()
+            
+            # Take whatever Instagram's own API responses already gave us
+            captured_profile = {}
+            if capture:
+                await capture.settle()
+                captured_profile = capture.get_profile(profile_data['username'])
+                for field in ('name', 'description', 'followers', 'totalposts', 'avatar'):
+                    if captured_profile.get(field) not in (None, ''):
+                        profile_data[field] = captured_profile[field]
+                if captured_profile:
+                    print(f"✅ Found profile fields in network responses: {', '.join(sorted(captured_profile))}")
+            
+            # Capture the rendered profile once and parse it offline
             try:
-                # Look for posts count in the page content
-                page_content = await self.page.content()
-                posts_patterns = [
-                    r'(\d+(?:,\d+)*)\s+posts', 
-                    r'(\d+(?:,\d+)*)\s*posts', 
-                    r'"media_count":(\d+)', 
-                ]
-                
-                for pattern in posts_patterns:
-                    posts_match = re.search(pattern, page_content, re.IGNORECASE)
-                    if posts_match:
-                        posts_count = posts_match.group(1)
-                        # Use parse_count to properly handle numbers with commas
-                        profile_data['totalposts'] = self.parse_count(posts_count)
-                        print(f"✅ Found total posts: {posts_count}")
-                        break
-                    
+                html = await page.content()
+                self.save_snapshot(profile_data['username'], html)
+                self.apply_snapshot(profile_data, ProfileSnapshot(html))
             except Exception as e:
-                print(f"⚠️ Could not extract posts count: {str(e)}")
+                print(f"⚠️ Could not parse profile snapshot: {str(e)}")
             
-            # Extract NAME and DESCRIPTION            try:
-                # Look for profile name and bio text
-                bio_selectors = [
-                    'section header div:last-child div span',
-                    'section header div div:last-child span',
-                    'div[data-testid="user-bio"]',
-                    'section header div:nth-child(2) div:nth-child(3) div span',
-                    'section header div:nth-child(2) div:last-child div span',
-                    'section div div div:last-child div span:not([aria-label])',
-                    'section header > div:nth-child(2) > div:last-child span',
-                    'h1[dir="auto"]'
-                ]
-                
-                found_texts = []
-                
-                for selector in bio_selectors:
-                    try:
-                        bio_elements = await self.page.query_selector_all(selector)
-                        for bio_element in bio_elements:
-                            if bio_element:
-                                bio_text = await bio_element.text_content()
-                                if bio_text and bio_text.strip():
-                                    # Skip if it's stats text or username
-                                    if (not self.is_stats_text(bio_text) and 
-                                        bio_text.strip() != profile_data['username']):
-                                        # Add to found texts if it's meaningful
-                                        if len(bio_text.strip()) > 3:
-                                            found_texts.append(bio_text.strip())
-                    except Exception as e:
-                        print(f"⚠️ Error extracting text from {selector}: {str(e)}")
-                
-                # Remove duplicates while preserving order
-                unique_texts = []
-                for text in found_texts:
-                    if text not in unique_texts:
-                        unique_texts.append(text)
-                        print(f"Found unique text: {text}")
+            # Extract NAME and DESCRIPTION live - only for whichever of them neither
+            # the API response nor the snapshot had
+            if not profile_data['name'] or not profile_data['description']:
+                try:
+                    # Look for profile name and bio text. The selectors keep their fixed
+                    # order - the first text is taken as the name, the next as the bio -
+                    # so the registry only records their hits and latency here
+                    found_texts = []
                 
-                # First text becomes name, second becomes description
-                if unique_texts:
-                    # Skip texts that are likely navigation or UI elements
-                    skip_texts = ['back', 'home', 'posts', 'followers', 'following']
-                    
-                    # First non-navigation text becomes name
-                    for text in unique_texts:
-                        if text.lower() not in skip_texts:
-                            profile_data['name'] = text
-                            print(f"✅ Found name: {text}")
+                    for selector in self.BIO_SELECTORS:
+                        probe_started = time.perf_counter()
+                        selector_texts = 0
+                        try:
+                            bio_elements = await page.query_selector_all(selector)
+                            for bio_element in bio_elements:
+                                if bio_element:
+                                    bio_text = await bio_element.text_content()
+                                    if bio_text and bio_text.strip():
+                                        # Skip if it's stats text or username
+                                        if (not self.is_stats_text(bio_text) and 
+                                            bio_text.strip() != profile_data['username']):
+                                            # Add to found texts if it's meaningful
+                                            if len(bio_text.strip()) > 3:
+                                                found_texts.append(bio_text.strip())
+                                                selector_texts += 1
+                        except Exception as e:
+                            print(f"⚠️ Error extracting text from {selector}: {str(e)}")
+                        self.selectors.record('bio', selector, selector_texts > 0,
+                                              (time.perf_counter() - probe_started) * 1000)
+                        
+                        # Name and description found - no need to probe further
+                        if len(set(found_texts)) >= 2:
                             break
-                            
-                    # Next non-navigation, non-name text becomes description
-                    if len(unique_texts) > 1:
-                        for text in unique_texts[1:]:
-                            if (text.lower() not in skip_texts and 
-                                text != profile_data['name'] and 
-                                not self.is_stats_text(text)):
-                                profile_data['description'] = text
-                                print(f"✅ Found description: {text}")
-                                break
-                    
-                    # Extract contact info from description first, then name as fallback
-                    contact_text = profile_data['description'] if profile_data['description'] else profile_data['name']
-                    phone, email = self.extract_contact_info(contact_text)
-                    profile_data['phone'] = phone
-                    profile_data['email'] = email
                 
-            except Exception as e:
-                print(f"⚠️ Could not extract name/description: {str(e)}")
+                    # Remove duplicates while preserving order
+                    unique_texts = list(dict.fromkeys(found_texts))
+                    self.fill_name_and_description(profile_data, unique_texts)
+                
+                except Exception as e:
+                    print(f"⚠️ Could not extract name/description: {str(e)}")
+            
+            # Extract contact info from description first, then name as fallback
+            contact_text = profile_data['description'] if profile_data['description'] else profile_data['name']
+            if contact_text:
+                phone, email = self.extract_contact_info(contact_text)
+                profile_data['phone'] = phone
+                profile_data['email'] = email
             
             # Extract avatar/profile picture URL
-            try:
-                avatar_selectors = [
-                    'img[data-testid="user-avatar"]',
-                    'img[alt*="profile picture"]',
-                    'span img',
-                    'header img'
-                ]
+            if not profile_data['avatar']:
+                try:
+                    avatar_selectors = [
+                        'img[data-testid="user-avatar"]',
+                        'img[alt*="profile picture"]',
+                        'span img',
+                        'header img'
+                    ]
                 
-                for selector in avatar_selectors:
-                    avatar_element = await self.page.query_selector(selector)
-                    if avatar_element:
-                        avatar_url = await avatar_element.get_attribute('src')
-                        if avatar_url:
-                            profile_data['avatar'] = avatar_url
-                            break
-            except Exception as e:
-                print(f"⚠️ Could not extract avatar: {str(e)}")
+                    for selector in avatar_selectors:
+                        avatar_element = await page.query_selector(selector)
+                        if avatar_element:
+                            avatar_url = await avatar_element.get_attribute('src')
+                            if avatar_url:
+                                profile_data['avatar'] = avatar_url
+                                break
+                except Exception as e:
+                    print(f"⚠️ Could not extract avatar: {str(e)}")
+            self.metrics.observe('profile.header', time.perf_counter() - started)
             
-            # Extract top 5 posts using new-tab strategy
+            # Extract the top reels; the grid is scrolled as far as needed there
             try:
-                print("📸 Scraping top 5 posts...")
-                print("⏳ Scrolling to load posts...")
-                await self.page.mouse.wheel(0, 500)  # scroll distance
-                await asyncio.sleep(3)  # wait time after scroll
-                  
-                # Extract posts using new tab logic
-                profile_data = await self.extract_post_data(profile_data)
+                print(f"📸 Scraping top {self.top_reels} reels...")
+                profile_data = await self.extract_post_data(profile_data, page=page, capture=capture)
                 
                 if not profile_data.get('posts'):
                     print("⚠️ No posts found")
                 else:
-                    print(f"✅ Successfully scraped {len(profile_data['posts'])} posts")
-                    
-            except Exception as e:
-                print(f"⚠️ Error scraping posts: {str(e)}")
+                    print(f"✅ Successfully scraped {len(profile_data['posts'])} posts")
+                    
+            except Exception as e:
+                print(f"⚠️ Error scraping posts: {str(e)}")
+                
+            print(f"✅ Successfully scraped: {profile_data['username']}")
+            return profile_data
+            
+        except Exception as e:
+            print(f"❌ Error scraping {profile_url}: {str(e)}")
+            return None
+        
+        finally:
+            if capture:
+                capture.detach()
+    
+    async def scrape_profiles(self, profile_urls, on_result=None, collect=True):
+        """Scrape profiles with a bounded pool of workers, each on its own tab
+        
+        URLs are pulled from the input into a small bounded queue as workers free up,
+        so the input can be a generator or async iterator that never sits in memory.
+        
+        Args:
+            profile_urls: Profile URLs in input order - a list, iterable or async iterable.
+            on_result: Optional coroutine function called as on_result(index, url, profile_data)
+                as soon as each profile is finished; index is the URL's position in the
+                input and profile_data is None if it failed.
+            collect (bool): Keep every result and return them. Streaming callers pass
+                False and only get results through on_result.
+        
+        Returns:
+            list: Profile data (None for failed profiles) in input order, or None if not collecting.
+        """
+        total = len(profile_urls) if hasattr(profile_urls, '__len__') else None
+        results = [] if collect else None
+        work_queue = asyncio.Queue(maxsize=self.max_workers * 2)
+        retry_queue = asyncio.Queue()  # Throttled profiles waiting for another attempt
+        retries = {}  # Index -> times the profile was requeued after throttling
+        worker_count = self.max_workers if total is None else min(self.max_workers, total)
+        
+        async def read_input():
+            # Fresh profiles are answered from the cache, the rest go to the workers
+            stale = self.stale_profiles(profile_urls, results, on_result)
+            try:
+                async for item in stale:
+                    await work_queue.put(item)
+            finally:
+                await stale.aclose()
+                for _ in range(worker_count):
+                    await work_queue.put(None)  # One stop marker per worker
+        
+        print(f"👷 Starting {worker_count} profile worker(s)...")
+        self.metrics.set_gauge('workers', worker_count)
+        
+        async def worker(worker_id):
+            # First worker reuses the main page, the rest open their own tab
+            page = self.page if worker_id == 0 else await self.new_scrape_page()
+            input_done = False
+            try:
+                while True:
+                    if not retry_queue.empty():
+                        index, url = retry_queue.get_nowait()
+                    elif input_done:
+                        return
+                    else:
+                        item = await work_queue.get()
+                        if item is None:
+                            input_done = True
+                            continue
+                        index, url = item
+                    
+                    # Pacing is shared by all workers and slows down when Instagram throttles
+                    await self.rate_limiter.acquire()
+                    print(f"\n[{index + 1}/{total or '?'}] Worker {worker_id + 1} processing: {url}")
+                    with self.metrics.profile(url) as record:
+                        profile_data = await self.scrape_profile(url, page=page, record=record)
+                        record['ok'] = bool(profile_data)
+                    
+                    if profile_data:
+                        self.rate_limiter.on_success()
+                    elif record.get('throttled') and retries.get(index, 0) < self.profile_retries:
+                        # Throttled rather than broken - try again once the limiter lets us
+                        retries[index] = retries.get(index, 0) + 1
+                        self.metrics.count('profile_retries')
+                        print(f"🔁 Requeueing {url} after throttling (retry {retries[index]}/{self.profile_retries})")
+                        retry_queue.put_nowait((index, url))
+                        continue
+                    retries.pop(index, None)
+                    
+                    if collect:
+                        results[index] = profile_data
+                    if profile_data:
+                        self.cache.put(url, profile_data)
+                    await self.deliver_result(on_result, index, url, profile_data)
+            finally:
+                if page is not self.page:
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        print(f"⚠️ Error closing worker tab: {str(e)}")
+        
+        reader = asyncio.ensure_future(read_input())
+        try:
+            await asyncio.gather(*(worker(i) for i in range(worker_count)))
+            await reader
+        finally:
+            reader.cancel()
+        return results
+    
+    def cached_result(self, profile_url):
+        """Cached profile_data if the profile was scraped within the TTL, else None"""
+        if self.cache_ttl <= 0 or self.force_refresh:
+            return None
+        return self.cache.get_fresh(profile_url, self.cache_ttl)
+    
+    async def deliver_result(self, on_result, index, url, profile_data):
+        """Hand one result to an on_result callback; its errors never stop the run"""
+        if not on_result:
+            return
+        try:
+            await on_result(index, url, profile_data)
+        except Exception as e:
+            print(f"⚠️ Error handling result for {url}: {str(e)}")
+    
+    async def stale_profiles(self, profile_urls, results=None, on_result=None):
+        """Answer profiles scraped within the TTL from the cache and yield the rest
+        
+        The one cached/fresh split behind scrape_profiles and scrape_profiles_sharded.
+        Fresh profiles go to on_result (unless stale_only) as they are read.
+        
+        Args:
+            profile_urls: Profile URLs in input order - a list, iterable or async iterable.
+            results (list): Gets one entry per input URL - the cached data or None -
+                or None to not collect.
+            on_result: Optional coroutine function called as on_result(index, url, profile_data).
+        
+        Yields:
+            tuple: (index, url) of every profile that still has to be scraped.
+        """
+        fresh = 0
+        try:
+            index = 0
+            async for url in iterate_async(profile_urls):
+                cached = self.cached_result(url)
+                if results is not None:
+                    results.append(cached)
+                if cached:
+                    fresh += 1
+                    if not self.stale_only:
+                        await self.deliver_result(on_result, index, url, cached)
+                else:
+                    yield index, url
+                index += 1
+        finally:
+            self.metrics.count('profiles_cached', fresh)
+            if fresh:
+                print(f"♻️ {fresh} profiles scraped within the last {self.cache_ttl / 3600:g}h, using cached data")
+    
+    def clone_session(self, shard_id):
+        """Fresh copy of the logged-in browser profile for one shard
+        
+        Lock files and disk caches are left out; cookies and local storage carry the session.
+        """
+        shard_path = os.path.join(self.shard_dir, f'shard-{shard_id + 1}')
+        if os.path.exists(shard_path):
+            shutil.rmtree(shard_path)
+        if os.path.isdir(self.user_data_dir):
+            shutil.copytree(self.user_data_dir, shard_path, ignore=shutil.ignore_patterns(
+                'Singleton*', 'lockfile', '*.lock', 'Cache', 'Code Cache', 'GPUCache',
+                'ShaderCache', 'GrShaderCache', 'DawnCache'
+            ))
+        else:
+            os.makedirs(shard_path)
+        return shard_path
+    
+    def shard_settings(self, shard_id):
+        """Scraper attributes a shard process copies from the coordinator"""
+        settings = {attr: getattr(self, attr) for attr in (
+            'base_url', 'max_workers', 'profile_retries', 'reel_concurrency', 'page_pool_size', 'network_extract',
+            'delta_mode', 'delta_threshold', 'har_replay_path', 'snapshot_dir', 'device_scale_factor',
+            'storage_state_path', 'use_storage_state', 'worker_viewport', 'worker_scale_factor', 'top_reels'
+        )}
+        # Files every process would otherwise overwrite get a per-shard name
+        if self.har_record_path:
+            root, ext = os.path.splitext(self.har_record_path)
+            settings['har_record_path'] = f'{root}-shard{shard_id + 1}{ext}'
+        if self.metrics.prom_path:
+            root, ext = os.path.splitext(self.metrics.prom_path)
+            settings['metrics_prom_path'] = f'{root}-shard{shard_id + 1}{ext}'
+        # The account's rate budget is split between the shards
+        limiter = self.rate_limiter
+        settings['rate_per_minute'] = tuple(
+            rate * 60 / self.shards for rate in (limiter.rate, limiter.min_rate, limiter.max_rate)
+        ) if limiter.enabled else (0, 0, 0)
+        return settings
+    
+    async def scrape_profiles_sharded(self, profile_urls, on_result=None, collect=True):
+        """Scrape profiles across self.shards processes, each driving its own browser
+        
+        The coordinator (this scraper) keeps the cache check, on_result and therefore
+        every sheet write; shard processes only scrape and stream results back.
+        Same arguments and return value as scrape_profiles.
+        """
+        # Shards are split up front, so the stale URLs (not the results) are read in full
+        results = [] if collect else None
+        stale = [item async for item in self.stale_profiles(profile_urls, results, on_result)]
+        if not stale:
+            return results
+        
+        # The coordinator's browser must be closed before its profile is copied (or its
+        # storage_state refreshed); with an exported login the shards skip the copy entirely
+        await self.close_browser()
+        from_state = self.storage_state_ready()
+        
+        shard_count = min(self.shards, len(stale))
+        ctx = multiprocessing.get_context('spawn')
+        result_queue = ctx.Queue()
+        processes = []
+        for shard_id in range(shard_count):
+            shard_stale = stale[shard_id::shard_count]
+            shard_urls = [url for _, url in shard_stale]
+            process = ctx.Process(
+                target=run_shard,
+                args=(shard_id, self.user_data_dir if from_state else self.clone_session(shard_id),
+                      shard_urls, [index for index, _ in shard_stale], self.shard_settings(shard_id), result_queue),
+                name=f'shard-{shard_id + 1}'
+            )
+            process.start()
+            processes.append(process)
+            print(f"🧩 Shard {shard_id + 1}/{shard_count} started with {len(shard_urls)} profiles (pid {process.pid})")
+        self.metrics.set_gauge('shards', shard_count)
+        
+        # Stream results back as shards finish profiles; a shard that dies is given up on
+        loop = asyncio.get_running_loop()
+        running = set(range(shard_count))
+        try:
+            while running:
+                try:
+                    kind, key, profile_data = await loop.run_in_executor(
+                        None, functools.partial(result_queue.get, timeout=1)
+                    )
+                except queue.Empty:
+                    for shard_id in list(running):
+                        if processes[shard_id].exitcode not in (None, 0):
+                            print(f"❌ Shard {shard_id + 1} exited with code {processes[shard_id].exitcode}")
+                            running.discard(shard_id)
+                    continue
                 
-            print(f"✅ Successfully scraped: {profile_data['username']}")
-            return profile_data
-            
-        except Exception as e:
-            print(f"❌ Error scraping {profile_url}: {str(e)}")
-            return None
+                if kind == 'selectors':
+                    self.selectors.merge(profile_data)  # Saved once, with the coordinator's cleanup
+                    continue
+                if kind == 'done':
+                    running.discard(key)
+                    print(f"✅ Shard {key + 1} finished")
+                    continue
+                
+                index, url = key
+                if collect:
+                    results[index] = profile_data
+                await self.deliver_result(on_result, index, url, profile_data)
+        finally:
+            for process in processes:
+                await loop.run_in_executor(None, process.join, 60)
+                if process.is_alive():
+                    process.terminate()
+        return results
     
     async def scrape_from_excel(self, excel_file_path):
-        """Read Excel file and scrape all profiles"""
+        """Stream profile URLs from an xlsx or csv file and scrape them"""
         try:
-            # Read Excel file
-            df = pd.read_excel(excel_file_path)
-            print(f"📊 Found {len(df)} profiles to scrape")
-            
-            url_columns = ['url', 'link', 'profile_url', 'instagram_url']
-            url_column = None
-            
-            for col in url_columns:
-                if col in df.columns:
-                    url_column = col
-                    break
-            
-            if not url_column:
-                print("❌ Could not find URL column in Excel file")
-                print(f"Available columns: {list(df.columns)}")
-                return
-            profile_urls = df[url_column].dropna().tolist()
+            if excel_file_path.lower().endswith('.csv'):
+                profile_urls = iter_csv_urls(excel_file_path)
+            else:
+                profile_urls = iter_excel_urls(excel_file_path)
             
-            print(f"🎯 Starting to scrape {len(profile_urls)} profiles...")
+            print(f"🎯 Streaming profiles from {excel_file_path}...")
             
-            for i, url in enumerate(profile_urls, 1):
-                print(f"\n[{i}/{len(profile_urls)}] Processing: {url}")
-                
-                profile_data = await self.scrape_profile(url)
-                
-                if profile_data:
-                    self.scraped_data.append(profile_data)
-                
-                # Add delay between requests to avoid rate limiting
-                if i < len(profile_urls):
-                    delay = 5  # 5 seconds delay
-                    print(f"⏳ Waiting {delay} seconds before next profile...")
-                    await asyncio.sleep(delay)
+            sinks = self.file_sinks()
+            if not sinks:
+                print("⚠️ No OUTPUT_FILES / --output set - results will only be summarized")
+            await self.run_pipeline(profile_urls, sinks)
             
-            print(f"\n✅ Scraping complete! Successfully scraped {len(self.scraped_data)} profiles")
+            print(f"\n✅ Scraping complete! Successfully scraped {self.result_stats['scraped']} profiles")
             
         except Exception as e:
-            print(f"❌ Error reading Excel file: {str(e)}")
+            print(f"❌ Error reading input file: {str(e)}")
       
+    async def run_pipeline(self, profile_urls, sinks):
+        """Scrape profile_urls, streaming every result into sinks as it is produced
+        
+        Results are not collected; the totals end up in self.result_stats.
+        """
+        pipeline = ResultPipeline(sinks, self.normalize_result, queue_size=self.pipeline_queue_size)
+        await pipeline.start()
+        try:
+            scrape = self.scrape_profiles_sharded if self.shards > 1 else self.scrape_profiles
+            await scrape(profile_urls, on_result=pipeline.put, collect=False)
+        finally:
+            # Deliver whatever is still queued, even if scraping was interrupted
+            await pipeline.close()
+            self.result_stats = pipeline.stats
+    
+    def normalize_result(self, index, url, profile_data):
+        """Pipeline record for one finished profile (see ResultPipeline)"""
+        return {
+            'index': index,
+            'url': url,
+            'profile': profile_data,
+            'columns': self.profile_to_columns(profile_data) if profile_data else None,
+            'scraped_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+    
+    def file_sinks(self):
+        """Sinks for self.output_paths, picked by file extension"""
+        sinks = []
+        for path in self.output_paths:
+            ext = os.path.splitext(path)[1].lower()
+            if ext in ('.jsonl', '.ndjson'):
+                sinks.append(JsonlSink(path))
+            elif ext == '.csv':
+                sinks.append(CsvSink(path, self.sheet_headers()))
+            elif ext == '.parquet':
+                sinks.append(ParquetSink(path, self.sheet_headers(), self.parse_count))
+            else:
+                print(f"⚠️ Unknown output type for {path} (use .jsonl, .csv or .parquet)")
+        return sinks
+    
     def save_results(self):
         """Print scraping summary"""
         try:
-            if not self.scraped_data:
+            stats = self.result_stats
+            if not stats.get('scraped'):
                 print("❌ No data to save")
                 return
             
             # Print summary
             print(f"\n📊 Scraping Summary:")
-            print(f"Total profiles scraped: {len(self.scraped_data)}")
-            print(f"Profiles with followers data: {sum(1 for item in self.scraped_data if item['followers'])}")
-            print(f"Profiles with email: {sum(1 for item in self.scraped_data if item['email'])}")
-            print(f"Profiles with phone: {sum(1 for item in self.scraped_data if item['phone'])}")
+            print(f"Total profiles scraped: {stats['scraped']}")
+            print(f"Profiles with followers data: {stats['followers']}")
+            print(f"Profiles with email: {stats['email']}")
+            print(f"Profiles with phone: {stats['phone']}")
+            if stats['failed']:
+                print(f"Profiles failed: {stats['failed']}")
             
         except Exception as e:
             print(f"❌ Error saving results: {str(e)}")
     
     async def cleanup(self):
         """Close browser but keep session data"""
-        if self.context:
-            await self.context.close()
+        self.cache.close()
+        if self.sheet_writer:
+            try:
+                await self.sheet_writer.close()
+            except Exception as e:
+                print(f"❌ Error flushing sheet updates: {str(e)}")
+        self.selectors.save()
+        if self.request_filter:
+            self.request_filter.print_summary()
+        if self.page_pool:
+            self.page_pool.print_summary()
+        self.metrics.print_summary()
+        self.metrics.close()
+        await self.stop_browser()
         print("🧹 Cleanup complete - Session data preserved")
 
-    async def extract_post_data(self, profile_data):
-        """Extract data from top 5 posts of a profile"""
+    @timed_stage('profile.posts')
+    async def extract_post_data(self, profile_data, page=None, capture=None):
+        """Extract data from the top self.top_reels reels of a profile
+        
+        Args:
+            profile_data (dict): Profile being scraped; 'posts' is filled in.
+            page: Profile tab. Defaults to the scraper's main page.
+            capture (ResponseCapture): Optional network capture shared with the profile page.
+        """
+        page = page or self.page
         posts = []
         try:              # Switch to reels tab
             print("🎬 Switching to reels tab...")
+            started = time.perf_counter()
             try:
-                reels_tab = await self.page.query_selector('a[href*="/reels/"]')
+                reels_tab = await page.query_selector('a[href*="/reels/"]')
                 if reels_tab:
-                    await reels_tab.click()
-                    await asyncio.sleep(3)  # Wait for tab switch
+                    # The tab switch is done once the reels feed request has answered
+                    await self.waits.after_response(page, r'/api/v1/clips/|/graphql', reels_tab.click, timeout_ms=5000)
                     print("✅ Switched to reels tab")
                 else:
                     print("⚠️ Could not find reels tab")
@@ -514,200 +2936,59 @@ class InstagramScraper:
 
                 # Wait for reels to be visible
                 print("🔍 Looking for reels...")
-                await self.page.wait_for_selector('a[href*="/reel/"]', timeout=5000)
+                await page.wait_for_selector('a[href*="/reel/"]', timeout=5000)
+                await self.waits.for_dom_stable(page, timeout_ms=3000)
             except Exception as e:
                 print(f"⚠️ Error switching to reels tab: {str(e)}")
+            self.metrics.observe('profile.reels_tab', time.perf_counter() - started)
+            started = time.perf_counter()
             
-            # Get page content for debugging
-            page_content = await self.page.content()
-            print("📄 Page source length:", len(page_content))
-            
-            for selector in self.POST_SELECTORS:
-                try:
-                    post_elements = await self.page.query_selector_all(selector)
-                    if post_elements and len(post_elements) > 0:
-                        print(f"✅ Found {len(post_elements)} post elements using selector: {selector}")
-                        # Debug first post element
-                        first_post = post_elements[0]
-                        href = await first_post.get_attribute('href')
-                        print(f"🔗 First post href: {href}")
-                        break
-                    else:
-                        print(f"⚠️ No posts found with selector: {selector}")
-                except Exception as e:
-                    print(f"⚠️ Error trying selector '{selector}': {str(e)}")
-                    continue  # Try next selector
-            
-            # Check if we found any posts
-            if not post_elements or len(post_elements) == 0:
+            # Top reels in grid order, collected while scrolling the virtualized grid
+            grid_reels = await self.collect_grid_reels(page, self.top_reels)
+            if not grid_reels:
                 print("⚠️ No post elements found using any selector")
                 return profile_data
-                
-            # Enhanced grid-based sorting
-            print("📊 Analyzing post grid layout...")
-            grid_posts = []
-            for post_element in post_elements:
-                try:
-                    box = await post_element.bounding_box()
-                    href = await post_element.get_attribute('href')
-                    
-                    # Only include valid post/reel links
-                    if box and href and ('/p/' in href or '/reel/' in href):
-                        # Round positions to handle slight misalignments
-                        y = round(box['y'] / 10) * 10  # Round to nearest 10 pixels
-                        x = round(box['x'] / 10) * 10
-                        
-                        # Add post type for debugging
-                        post_type = 'reel' if '/reel/' in href else 'post'
-                        #print(f"Found {post_type} at position x:{x}, y:{y}")
-                        
-                        grid_posts.append({
-                            'y': y,
-                            'x': x,
-                            'element': post_element,
-                            'type': post_type,
-                            'href': href
-                        })
-                except Exception as e:
-                    print(f"⚠️ Error processing grid item: {str(e)}")
-                    continue
-            
-            # Sort first by y (row) then x (column)
-            sorted_posts = sorted(grid_posts, key=lambda p: (p['y'], p['x']))
-            print(f"✅ Grid analysis complete - Found {len(sorted_posts)} items in order")
+            print(f"✅ Collected {len(grid_reels)} reels from the grid")
             
-            # Extract just the elements in order
-            sorted_elements = [post['element'] for post in sorted_posts]
-                
-            # Change number of posts to scrape here
-            for i, post_element in enumerate(sorted_elements[:3]):                
-                post_data = {
+            queued_posts = []
+            for href, grid_views in grid_reels:
+                queued_posts.append({
                     "type": "reel",
                     "caption": "",
                     "ownerFullName": profile_data.get('name', ''),
                     "ownerUsername": profile_data.get('username', ''),
-                    "url": "",
+                    "url": f'{self.base_url}{href}',
                     "commentsCount": 0,
                     "likesCount": 0,
-                    "viewCount": 0,
+                    "viewCount": grid_views,  # The grid is the only place views are shown
                     "timestamp": "",
                     "sharesCount": ""
-                }
-                
-                try:
-                    # Extract view count from grid first - this is the only place we'll get views
-                    print("🔍 Extracting view count from grid...")
-                    grid_views = await self.extract_grid_view_count(post_element)
-                    if grid_views > 0:
-                        post_data['viewCount'] = grid_views
-                        print(f"✅ Found grid view count: {grid_views}")
-                    else:
-                        print("⚠️ No view count found in grid")
-
-                    # Get post URL with safe fallback
-                    post_url = await post_element.get_attribute('href')
-                    if not post_url:
-                        print("⚠️ Could not extract post URL")
-                        continue
-                        
-                    post_data['url'] = f'https://www.instagram.com{post_url}'
-                    print(f"🔗 Processing post {i+1}/3: {post_data['url']}")
-                    
-                    # Open post in new tab - we'll get other data from individual page
-                    new_page = await self.context.new_page()
-                    await new_page.goto(post_data['url'], wait_until='networkidle')
-                    await asyncio.sleep(2)
-                    
-                    # Expand truncated content
-                    print("🔍 Looking for truncated content...")
-                    await new_page.evaluate(self.EXPAND_CONTENT_JS)
-                    await asyncio.sleep(2)
-                    
-                    # Extract caption with retries
-                    caption_found = False
-                    retry_count = 0
-                    while not caption_found and retry_count < 3:
-                        for selector in self.MODAL_SELECTORS['caption']:
-                            try:
-                                caption_element = await new_page.query_selector(selector)
-                                if caption_element:
-                                    caption_text = await caption_element.text_content()
-                                    if caption_text:
-                                        # Clean up caption
-                                        if ':' in caption_text and not caption_text.startswith('http'):
-                                            caption_text = ':'.join(caption_text.split(':')[1:]).strip()
-                                        caption_text = caption_text.replace('... more', '').strip()
-                                        
-                                        post_data['caption'] = caption_text
-                                        print(f"📝 Found caption: {caption_text[:100]}...")
-                                        caption_found = True
-                                        break
-                            except Exception:
-                                continue
-                        
-                        if not caption_found:
-                            retry_count += 1
-                            await asyncio.sleep(1)
-                    
-                    # Extract timestamp
-                    for selector in self.MODAL_SELECTORS['date']:
-                        try:
-                            date_element = await new_page.query_selector(selector)
-                            if date_element:
-                                timestamp = await date_element.get_attribute('datetime')
-                                if timestamp:
-                                    post_data['timestamp'] = timestamp
-                                    print(f"📅 Found timestamp: {timestamp}")
-                                    break
-                        except Exception:
-                            continue
-                    
-                    # Extract likes count with retries
-                    post_data['likesCount'] = await self.extract_likes_count(new_page)
-                    
-                    # Extract comments count with retries
-                    retry_count = 0
-                    while post_data['commentsCount'] == 0 and retry_count < 3:
-                        for selector in self.MODAL_SELECTORS['comments']:
-                            try:
-                                comments_element = await new_page.query_selector(selector)
-                                if comments_element:
-                                    comments_text = await comments_element.text_content()
-                                    if comments_text:
-                                        if 'view all' in comments_text.lower():
-                                            match = re.search(r'view all (\d+)', comments_text.lower())
-                                            if match:
-                                                post_data['commentsCount'] = self.parse_count(match.group(1))
-                                        else:
-                                            numbers = re.findall(r'\d+', comments_text)
-                                            if numbers:
-                                                post_data['commentsCount'] = self.parse_count(numbers[0])
-                                        
-                                        if post_data['commentsCount'] > 0:
-                                            print(f"💬 Found {post_data['commentsCount']} comments")
-                                            break
-                            except Exception:
-                                continue
-                        
-                        if post_data['commentsCount'] == 0:
-                            retry_count += 1
-                            await asyncio.sleep(1)
-                    
-                    posts.append(post_data)
-                    print(f"✅ Successfully extracted post {i+1}/3")
-                    
-                except Exception as e:
-                    print(f"⚠️ Error processing post: {str(e)}")
-                    continue
-                
-                finally:
-                    # Always close the new tab
-                    if new_page:
-                        try:
-                            await new_page.close()
-                            await asyncio.sleep(1)
-                        except Exception as e:
-                            print(f"⚠️ Error closing tab: {str(e)}")
+                })
+            self.metrics.observe('profile.reels_grid', time.perf_counter() - started)
+            
+            # Delta mode: reels whose grid views barely moved reuse last run's details
+            previous_posts = {}
+            if self.delta_mode:
+                previous_profile, _ = self.cache.get(profile_data.get('username'))
+                if previous_profile:
+                    previous_posts = {post.get('url'): post for post in previous_profile.get('posts') or []}
+            
+            # Open reel pages concurrently, capped per profile; gather keeps grid order
+            semaphore = asyncio.Semaphore(self.reel_concurrency)
+            
+            async def fetch_reel(i, post_data):
+                previous = previous_posts.get(post_data['url'])
+                if previous and self.reel_unchanged(post_data, previous):
+                    for field in ('caption', 'likesCount', 'commentsCount', 'timestamp'):
+                        post_data[field] = previous.get(field, post_data[field])
+                    print(f"♻️ Reel unchanged since last run, reusing details: {post_data['url']}")
+                    return post_data
+                async with semaphore:
+                    print(f"🔗 Processing post {i+1}/{len(queued_posts)}: {post_data['url']}")
+                    return await self.scrape_reel_page(post_data, capture=capture)
+            
+            results = await asyncio.gather(*(fetch_reel(i, post_data) for i, post_data in enumerate(queued_posts)))
+            posts = [post_data for post_data in results if post_data]
             
             # Update profile data
             profile_data['posts'] = posts
@@ -716,90 +2997,230 @@ class InstagramScraper:
         except Exception as e:
             print(f"❌ Error in post extraction: {str(e)}")
         
-        return profile_data    
-    async def extract_likes_count(self, new_page):
-        """Extract likes count with proper selectors for mobile Instagram"""
-        likes_count = 0
+        return profile_data
+
+    def reel_unchanged(self, post_data, previous):
+        """Whether a reel's grid view count stayed within delta_threshold of last run's"""
+        current_views = post_data.get('viewCount') or 0
+        previous_views = previous.get('viewCount') or 0
+        if not current_views or not previous_views:
+            return False  # Nothing to compare against - open the reel
+        return abs(current_views - previous_views) <= previous_views * self.delta_threshold
+
+    def apply_captured_media(self, post_data, capture):
+        """Copy reel fields found in network responses into post_data
+        
+        Returns:
+            set: Names of the fields that were filled in.
+        """
+        filled = set()
+        if not capture:
+            return filled
+        media = capture.get_media(post_data['url'])
+        for field in ('caption', 'timestamp', 'likesCount', 'commentsCount'):
+            if media.get(field) not in (None, ''):
+                post_data[field] = media[field]
+                filled.add(field)
+        # Grid views stay authoritative, the API only fills them when the grid had none
+        if not post_data.get('viewCount') and media.get('viewCount'):
+            post_data['viewCount'] = media['viewCount']
+        return filled
+
+    @timed_stage('reel.page')
+    async def scrape_reel_page(self, post_data, capture=None):
+        """Open a reel in its own tab and fill in caption, timestamp, likes and comments
+        
+        Args:
+            post_data (dict): Post entry with 'url' (and grid 'viewCount') already set.
+            capture (ResponseCapture): Optional network capture; fields it already holds
+                skip the DOM, and the reel page is not opened at all if it has everything.
+        
+        Returns:
+            dict: The updated post_data, or None if the reel page could not be processed.
+        """
+        all_fields = {'caption', 'timestamp', 'likesCount', 'commentsCount'}
+        filled = self.apply_captured_media(post_data, capture)
+        if filled == all_fields:
+            print(f"✅ Reel data taken from network responses: {post_data['url']}")
+            return post_data
         
+        new_page = None
         try:
-            # Wait for the section containing likes to load
-            await new_page.wait_for_selector('section', timeout=10000)
-            await asyncio.sleep(3)  # Additional wait for dynamic content
-            
-            # Method 1: Look for visible likes count (like "2,803 likes")
-            visible_likes_selectors = [
-                'section > div:nth-child(2) > div > div > span',  # Most common location
-                'section > div > div > span:has-text("likes")',   # Contains "likes" text
-                'section span:has-text("likes")',                # Generic likes text
-                'section div > span:has-text("likes")',          # Nested likes text
-            ]
-            
-            for selector in visible_likes_selectors:
-                try:
-                    likes_element = await new_page.query_selector(selector)
-                    if likes_element:
-                        likes_text = await likes_element.text_content()
-                        if likes_text and 'likes' in likes_text.lower():
-                            # Extract number from "2,803 likes" format
-                            likes_count = self.parse_count(likes_text)
-                            if likes_count > 0:
-                                print(f"✅ Found visible likes: {likes_text} = {likes_count}")
-                                return likes_count
-                except Exception as e:
-                    continue
-            
-            # Method 2: Look for "Liked by X and others" format
-            liked_by_selectors = [
-                'section span:has-text("Liked by")',
-                'section div:has-text("Liked by")',
-                'section span:has-text("and others")',
-            ]
-            
-            for selector in liked_by_selectors:
-                try:
-                    liked_element = await new_page.query_selector(selector)
-                    if liked_element:
-                        liked_text = await liked_element.text_content()
-                        if liked_text and 'liked by' in liked_text.lower():
-                            # Extract from "Liked by username and X others"
-                            match = re.search(r'and\s+(\d+(?:,\d+)*)\s+others?', liked_text, re.IGNORECASE)
-                            if match:
-                                others_count = int(match.group(1).replace(',', ''))
-                                likes_count = others_count + 1  # +1 for the named user
-                                print(f"✅ Found 'liked by' format: {liked_text} = {likes_count}")
-                                return likes_count
-                            else:
-                                # Just "Liked by username and others" without count
-                                print(f"⚠️ Hidden likes detected: {liked_text}")
-                                return 0  # Hidden likes count
-                except Exception as e:
-                    continue
+            # Borrow a warm tab from the pool - we'll get other data from the reel's page
+            new_page = await self.page_pool.acquire()
+            if capture:
+                capture.attach(new_page)
+            response = await new_page.goto(post_data['url'], wait_until='networkidle')
+            reason = await self.detect_throttle(new_page, response)
+            if reason:
+                self.rate_limiter.on_throttle(reason)
+                print(f"🐢 Instagram is throttling ({reason}), skipping reel {post_data['url']}")
+                return None
+            await self.waits.for_selector(new_page, ['time[datetime]', 'section'])
+            
+            if capture:
+                await capture.settle()
+                filled = self.apply_captured_media(post_data, capture)
+                if filled:
+                    print(f"✅ Found reel fields in network responses: {', '.join(sorted(filled))}")
+            
+            # Expand truncated content
+            if 'caption' not in filled:
+                print("🔍 Looking for truncated content...")
+                await new_page.evaluate(self.EXPAND_CONTENT_JS)
+            
+            # Resolve every remaining field in one in-page call per attempt;
+            # caption and comments are retried while the page is still rendering
+            missing = all_fields - filled
+            for attempt in range(3):
+                if attempt:
+                    self.metrics.count('reel_field_retries')
+                fields = self.parse_reel_fields(await self.extract_reel_fields(new_page))
+                for field in list(missing):
+                    if field in fields:
+                        post_data[field] = fields[field]
+                        if field != 'likesCount' or fields[field] > 0:
+                            missing.discard(field)
+                if not missing & {'caption', 'commentsCount'}:
+                    break
+                await self.waits.for_dom_stable(new_page, timeout_ms=1000)
             
-            # Method 3: Fallback - look for any element with numbers near the heart button
-            try:
-                # Get all spans in the section
-                all_spans = await new_page.query_selector_all('section span')
-                for span in all_spans:
-                    span_text = await span.text_content()
-                    if span_text and re.search(r'\d+.*likes?', span_text, re.IGNORECASE):
-                        likes_count = self.parse_count(span_text)
-                        if likes_count > 0:
-                            print(f"✅ Found likes via fallback: {span_text} = {likes_count}")
-                            return likes_count
-            except Exception as e:
-                print(f"⚠️ Fallback method failed: {str(e)}")
+            if post_data['caption']:
+                print(f"📝 Found caption: {post_data['caption'][:100]}...")
+            if post_data['timestamp']:
+                print(f"📅 Found timestamp: {post_data['timestamp']}")
+            print(f"❤️ Likes: {post_data['likesCount']}, 💬 Comments: {post_data['commentsCount']}")
             
-            print("⚠️ No likes count found - may be hidden")
-            return 0
+            print(f"✅ Successfully extracted post: {post_data['url']}")
+            return post_data
             
         except Exception as e:
-            print(f"❌ Error extracting likes: {str(e)}")
-            return 0
+            print(f"⚠️ Error processing post {post_data.get('url')}: {str(e)}")
+            return None
+        
+        finally:
+            # Always hand the tab back, reset, for the next reel
+            if new_page:
+                if capture:
+                    capture.detach(new_page)
+                await self.page_pool.release(new_page)
 
-    async def extract_views_count(self, new_page):
-        """This method is deprecated as we only get views from grid view now"""
-        print("⚠️ View count extraction from individual pages is no longer supported")
-        return 0
+    @timed_stage('reel.fields')
+    async def extract_reel_fields(self, page):
+        """Resolve the whole reel selector table in the browser with one evaluate call
+        
+        Returns:
+            dict: Raw candidate texts per field (see REEL_EXTRACT_JS), empty on error.
+        """
+        try:
+            raw = await page.evaluate(self.REEL_EXTRACT_JS, self.reel_field_table()) or {}
+            for field, selector, hit, elapsed_ms in raw.get('probes', []):
+                self.selectors.record(field, selector, hit, elapsed_ms)
+            return raw
+        except Exception as e:
+            print(f"⚠️ In-page reel extraction failed: {str(e)}")
+            return {}
+
+    def reel_field_table(self):
+        """Selector table for REEL_EXTRACT_JS, each field ranked by the selector registry
+        
+        'first' fields stop at the first selector whose text matches the field's accept
+        pattern, 'attribute' fields read an attribute the same way, 'all' fields collect
+        every likes-looking text as a last resort. A field is skipped when any of the
+        fields in its 'unless' list already found something, so the ranked likes
+        fallbacks and the generic scan only run when the likes texts are missing.
+        """
+        likes_fields = ['likes_text', 'liked_by']
+        first = {
+            field: {
+                'selectors': self.selectors.ordered(field, self.MODAL_SELECTORS[field]),
+                'accept': self.REEL_FIELD_ACCEPT[field],
+            }
+            for field in ('caption', 'comments', 'likes_text', 'liked_by', 'likes')
+        }
+        first['likes']['unless'] = likes_fields
+        return {
+            'first': first,
+            'attribute': {
+                'date': {
+                    'selectors': self.selectors.ordered('date', self.MODAL_SELECTORS['date']),
+                    'attribute': 'datetime',
+                },
+            },
+            'all': {
+                'likes': {'selectors': ['section span'], 'unless': likes_fields + ['likes']},
+            },
+        }
+
+    def parse_reel_fields(self, raw):
+        """Turn extract_reel_fields output into post fields
+        
+        Returns:
+            dict: Any of caption, timestamp, likesCount and commentsCount that were found.
+        """
+        fields = {}
+        
+        # Caption: first non-empty candidate, without the "username:" prefix and "more" link
+        for caption_text in raw.get('caption', []):
+            if caption_text:
+                if ':' in caption_text and not caption_text.startswith('http'):
+                    caption_text = ':'.join(caption_text.split(':')[1:]).strip()
+                fields['caption'] = caption_text.replace('... more', '').strip()
+                break
+        
+        for timestamp in raw.get('date', []):
+            if timestamp:
+                fields['timestamp'] = timestamp
+                break
+        
+        likes_count = self.parse_likes_count(raw)
+        if likes_count is not None:
+            fields['likesCount'] = likes_count
+        
+        for comments_text in raw.get('comments', []):
+            if not comments_text:
+                continue
+            comments_count = 0
+            if 'view all' in comments_text.lower():
+                match = re.search(r'view all (\d+)', comments_text.lower())
+                if match:
+                    comments_count = self.parse_count(match.group(1))
+            else:
+                numbers = re.findall(r'\d+', comments_text)
+                if numbers:
+                    comments_count = self.parse_count(numbers[0])
+            if comments_count > 0:
+                fields['commentsCount'] = comments_count
+                break
+        
+        return fields
+
+    def parse_likes_count(self, raw):
+        """Likes from the extractor's candidates: 0 when hidden, None when not found"""
+        # Method 1: visible likes count (like "2,803 likes")
+        for likes_text in raw.get('likes_text', []):
+            if likes_text and 'likes' in likes_text.lower():
+                likes_count = self.parse_count(likes_text)
+                if likes_count > 0:
+                    return likes_count
+        
+        # Method 2: "Liked by X and others" format
+        for liked_text in raw.get('liked_by', []):
+            if liked_text and 'liked by' in liked_text.lower():
+                match = re.search(r'and\s+(\d+(?:,\d+)*)\s+others?', liked_text, re.IGNORECASE)
+                if match:
+                    # +1 for the named user
+                    return int(match.group(1).replace(',', '')) + 1
+                # Just "Liked by username and others" without count - hidden likes
+                return 0
+        
+        # Method 3: any likes-looking text from the generic fallbacks
+        for span_text in raw.get('likes', []):
+            likes_count = self.parse_count(span_text)
+            if likes_count > 0:
+                return likes_count
+        
+        return None
 
     def parse_count(self, text):
         """Parse number from Instagram text that contains numbers"""
@@ -841,6 +3262,156 @@ class InstagramScraper:
             print(f"⚠️ Error parsing count from '{text}': {str(e)}")
             return 0
 
+    def pick_name_and_description(self, texts):
+        """First non-navigation text is the name, the next non-stats text the description"""
+        # Skip texts that are likely navigation or UI elements
+        skip_texts = ['back', 'home', 'posts', 'followers', 'following']
+        name = ''
+        description = ''
+        for text in texts:
+            if text.lower() not in skip_texts:
+                name = text
+                break
+        for text in texts[1:]:
+            if (text.lower() not in skip_texts and 
+                text != name and 
+                not self.is_stats_text(text)):
+                description = text
+                break
+        return name, description
+
+    def save_snapshot(self, username, html):
+        """Keep the profile HTML on disk when SNAPSHOT_DIR is set"""
+        if not self.snapshot_dir or not username:
+            return
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(os.path.join(self.snapshot_dir, f'{username.lower()}.html'), 'w', encoding='utf-8') as f:
+                f.write(html)
+        except Exception as e:
+            print(f"⚠️ Could not save snapshot for {username}: {str(e)}")
+
+    def apply_snapshot(self, profile_data, snapshot):
+        """Fill empty profile fields from a ProfileSnapshot
+        
+        Args:
+            profile_data (dict): Profile being built; only empty fields are set.
+            snapshot (ProfileSnapshot): Parsed profile HTML.
+        """
+        if profile_data['followers'] == '' and snapshot.followers:
+            profile_data['followers'] = snapshot.followers
+            print(f"✅ Found followers: {snapshot.followers}")
+        
+        if profile_data['totalposts'] == '' and snapshot.posts_count:
+            # Use parse_count to properly handle numbers with commas
+            profile_data['totalposts'] = self.parse_count(snapshot.posts_count)
+            print(f"✅ Found total posts: {snapshot.posts_count}")
+        
+        if not profile_data['name'] or not profile_data['description']:
+            username = profile_data['username']
+            texts = [text for text in snapshot.texts
+                     if len(text) > 3 and text != username and not self.is_stats_text(text)]
+            if snapshot.og_name and snapshot.og_name not in texts:
+                texts.insert(0, snapshot.og_name)
+            self.fill_name_and_description(profile_data, texts)
+        
+        if not profile_data['avatar'] and snapshot.avatar:
+            profile_data['avatar'] = snapshot.avatar
+
+    def fill_name_and_description(self, profile_data, texts):
+        """Set name and description from candidate texts, leaving fields already found alone"""
+        name, description = self.pick_name_and_description(texts)
+        if name and not profile_data['name']:
+            profile_data['name'] = name
+            print(f"✅ Found name: {name}")
+        if description and not profile_data['description']:
+            profile_data['description'] = description
+            print(f"✅ Found description: {description}")
+
+    def parse_snapshot_file(self, path):
+        """Re-run profile header extraction on a saved snapshot
+        
+        Returns:
+            dict: Profile fields parsed from the file (posts are not part of a snapshot).
+        """
+        username = os.path.splitext(os.path.basename(path))[0]
+        profile_data = {
+            'username': username,
+            'platform': 'Instagram',
+            'name': '',
+            'phone': '',
+            'email': '',
+            'description': '',
+            'followers': '',
+            'avatar': '',
+            'totalposts': ''
+        }
+        with open(path, 'r', encoding='utf-8') as f:
+            self.apply_snapshot(profile_data, ProfileSnapshot(f.read()))
+        contact_text = profile_data['description'] if profile_data['description'] else profile_data['name']
+        if contact_text:
+            profile_data['phone'], profile_data['email'] = self.extract_contact_info(contact_text)
+        return profile_data
+
+    async def reparse_snapshots_to_sheet(self):
+        """Update sheet rows from saved snapshots instead of re-visiting the profiles"""
+        if not self.snapshot_dir:
+            print("❌ SNAPSHOT_DIR is not set")
+            return
+        headers = await self.sheet_writer.load_headers()
+        try:
+            link_col_idx = headers.index('link') + 1
+        except ValueError:
+            print("❌ No 'link' column found in sheet")
+            return
+        
+        updated = 0
+        link_col = await self.sheet_writer.run(self.worksheet.col_values, link_col_idx)
+        for row_num, url in enumerate(link_col[1:], start=2):
+            username = username_from_url(url)
+            if not username:
+                continue
+            path = os.path.join(self.snapshot_dir, f'{username.lower()}.html')
+            if not os.path.exists(path):
+                continue
+            profile_data = self.parse_snapshot_file(path)
+            profile_data['username'] = username
+            await self.update_sheet_row(profile_data, row_num)
+            updated += 1
+        await self.flush_sheet()
+        print(f"✅ Re-parsed {updated} profiles from {self.snapshot_dir}")
+
+    def is_stats_text(self, text):
+        """Check if text is a profile stats line such as '1,234 followers'"""
+        return bool(re.search(r'^\s*[\d.,]+\s*[kmb]?\s+(posts?|followers?|following)\b',
+                              str(text).strip(), re.IGNORECASE))
+
+    def extract_contact_info(self, text):
+        """Extract the first phone number and email address from bio text
+        
+        A phone number needs a leading + or at least 10 digits; runs made only of years
+        and dates ('2019 - 2024', '12.05.2024') are skipped.
+        
+        Returns:
+            tuple: (phone, email), empty strings when not found.
+        """
+        if not text:
+            return '', ''
+        email_match = re.search(r'[\w.+-]+@[\w-]+\.[\w.-]+', text)
+        email = email_match.group(0) if email_match else ''
+        year_or_date = r'((19|20)\d{2}|\d{1,2}[./-]\d{1,2}[./-]\d{2,4})'
+        phone = ''
+        for match in re.finditer(r'\+?\(?\d[\d\s().-]{7,}\d', text):
+            candidate = match.group(0).strip()
+            digits = sum(char.isdigit() for char in candidate)
+            if digits < (8 if candidate.startswith('+') else 10):
+                continue
+            if re.fullmatch(rf'{year_or_date}([\s.-]+{year_or_date})*', candidate):
+                continue
+            phone = candidate
+            break
+        return phone, email
+
     def setup_google_sheets(self):
         """Initialize connection to Google Sheets"""
         try:
@@ -859,6 +3430,11 @@ class InstagramScraper:
             self.sheet_client = gspread.authorize(credentials)
             spreadsheet = self.sheet_client.open_by_key(self.sheet_id)
             self.worksheet = spreadsheet.worksheet(self.sheet_name)
+            self.sheet_writer = SheetWriter(
+                self.worksheet,
+                batch_rows=int(os.getenv('SHEET_BATCH_ROWS', '25')),
+                flush_seconds=float(os.getenv('SHEET_FLUSH_SECONDS', '30'))
+            )
             
             print("✅ Connected to Google Sheet successfully")
             
@@ -866,223 +3442,282 @@ class InstagramScraper:
             print(f"❌ Failed to connect to Google Sheets: {str(e)}")
             raise    
     
-    async def scrape_from_sheet(self):
-        """Read profile URLs from Google Sheet and scrape them"""
+    async def scrape_from_sheet(self, resume=False):
+        """Read profile URLs from Google Sheet and scrape them
+        
+        Args:
+            resume (bool): Skip rows the journal has as done and retry failed ones.
+        """
+        journal = None
         try:
-            # Get all records
-            all_data = self.worksheet.get_all_records()
-            if not all_data:
-                print("❌ No data found in sheet")
-                return
-                
-            # Find the link column
-            headers = self.worksheet.row_values(1)
+            # Find the link column (header row is cached by the sheet writer)
+            headers = await self.sheet_writer.load_headers()
             try:
                 link_col_idx = headers.index('link') + 1  # gspread uses 1-based indexing
             except ValueError:
                 print("❌ No 'link' column found in sheet")
                 return
-
-            # Get all values in link column
-            link_col = self.worksheet.col_values(link_col_idx)[1:]  # Skip header
-            
-            # Create mapping of URLs to row numbers for updating
-            row_map = {}  # Maps URLs to row numbers
-            profile_urls = []
             
-            for row_num, url in enumerate(link_col, start=2):  # Start from row 2 (after header)
-                if url and url.strip():
-                    profile_urls.append(url.strip())
-                    row_map[url.strip()] = row_num
-            
-            print(f"📊 Found {len(profile_urls)} profiles to scrape")
-            
-            # Scrape profiles
-            for i, url in enumerate(profile_urls, 1):
-                print(f"\n[{i}/{len(profile_urls)}] Processing: {url}")
-                
-                profile_data = await self.scrape_profile(url)
-                
-                if profile_data:
-                    # Update sheet with scraped data
-                    await self.update_sheet_row(profile_data, row_map[url])
-                    self.scraped_data.append(profile_data)
-                
-                # Add delay between requests
-                if i < len(profile_urls):
-                    delay = 5
-                    print(f"⏳ Waiting {delay} seconds before next profile...")
-                    await asyncio.sleep(delay)
-            
-            print(f"\n✅ Scraping complete! Successfully scraped {len(self.scraped_data)} profiles")
+            # Journal every URL; rows become done only once the sheet has them
+            journal = ScrapeJournal(self.journal_file)
+            journal.start_run(resume=resume)
+            self.sheet_writer.on_written = journal.mark_rows_done
+            self.sheet_writer.metrics = self.metrics
+            if resume:
+                counts = journal.status_counts()
+                print(f"⏭️ Resuming: skipping {counts.get('done', 0)} done rows, "
+                      f"retrying {counts.get('failed', 0)} failed ones")
+            
+            # Stream the link column a page at a time; scraping starts after the first page
+            async def sheet_urls():
+                found = 0
+                async for page in iter_sheet_column(self.sheet_writer, link_col_idx, self.sheet_read_rows):
+                    rows = [(url.strip(), row_num) for row_num, url in page if url and url.strip()]
+                    journal.register(rows)
+                    done = journal.done_among(url for url, _ in rows) if resume else set()
+                    for url, _ in rows:
+                        found += 1
+                        if url not in done:
+                            yield url
+                if not found:
+                    print("❌ No data found in sheet")
+            
+            # Scrape profiles, streaming each result to its sheet row and any output files
+            await self.run_pipeline(sheet_urls(), [SheetSink(self, journal.row_for, journal)] + self.file_sinks())
+            
+            print(f"\n✅ Scraping complete! Successfully scraped {self.result_stats['scraped']} profiles")
             
         except Exception as e:
             print(f"❌ Error reading from sheet: {str(e)}")    
+        
+        finally:
+            if journal:
+                self.sheet_writer.on_written = None
+                journal.close()
+
+    def profile_to_columns(self, profile_data):
+        """Map profile_data onto sheet headers
+        
+        Returns:
+            dict: Header -> cell value for every column this profile fills.
+        """
+        # Map profile_data fields to columns
+        field_mapping = {
+            'username': 'Username',
+            'platform': 'Platform',
+            'name': 'Name',
+            'phone': 'Phone',
+            'email': 'Email',
+            'description': 'Description',
+            'followers': 'Followers',
+            'avatar': 'Avatar URL',
+            'totalposts': 'Total Posts'
+        }
+        values = {}
+        for field, column in field_mapping.items():
+            if field in profile_data:
+                values[column] = profile_data[field]
+        
+        # Reel columns for each scraped post
+        for i, post in enumerate(profile_data.get('posts') or [], start=1):
+            values.update({
+                f'Reel {i} URL': post.get('url', ''),
+                f'Reel {i} Caption': post.get('caption', ''),
+                f'Reel {i} Likes': post.get('likesCount', ''),
+                f'Reel {i} Comments': post.get('commentsCount', ''),
+                f'Reel {i} Views': post.get('viewCount', ''),
+                f'Reel {i} Date': post.get('timestamp', '')
+            })
+        return values
 
+    def sheet_headers(self, reel_count=None):
+        """Profile headers plus reel headers for the first reel_count reels (default: top_reels)"""
+        reel_count = self.top_reels if reel_count is None else reel_count
+        headers = [
+            'Username', 'Platform', 'Name', 'Phone', 'Email', 'Description',
+            'Followers', 'Avatar URL', 'Total Posts'
+        ]
+        for i in range(1, reel_count + 1):
+            headers.extend([
+                f'Reel {i} URL', f'Reel {i} Caption',
+                f'Reel {i} Likes', f'Reel {i} Comments',
+                f'Reel {i} Views', f'Reel {i} Date'
+            ])
+        return headers
+
+    @timed_stage('update_sheet_row')
     async def update_sheet_row(self, profile_data, row_num):
-        """Update a row in the sheet with scraped data"""
+        """Queue a row update with scraped data; the sheet writer sends it in batches"""
         try:
-            # Get current headers
-            headers = self.worksheet.row_values(1)
-            
-            # Prepare updates for each column
-            updates = []
-            
-            # Create new headers if they don't exist
-            needed_headers = [
-                'Username', 'Platform', 'Name', 'Phone', 'Email', 'Description',
-                'Followers', 'Avatar URL', 'Total Posts'
-            ]
-            
-            # Create reel-related headers for first 3 reels
-            for i in range(1, 4):
-                needed_headers.extend([
-                    f'Reel {i} URL', f'Reel {i} Caption',
-                    f'Reel {i} Likes', f'Reel {i} Comments',
-                    f'Reel {i} Views', f'Reel {i} Date'
-                ])
-            
-            # Add any missing headers
-            new_headers = False
-            for header in needed_headers:
-                if header not in headers:
-                    headers.append(header)
-                    new_headers = True
-            
-            # Update headers if new ones were added
-            if new_headers:
-                self.worksheet.update('A1', [headers])
-                print("✅ Added new columns to sheet")
-            
-            # Map profile_data fields to columns
-            field_mapping = {
-                'username': 'Username',
-                'platform': 'Platform',
-                'name': 'Name',
-                'phone': 'Phone',
-                'email': 'Email',
-                'description': 'Description',
-                'followers': 'Followers',
-                'avatar': 'Avatar URL',
-                'totalposts': 'Total Posts'
-            }
-            
-            # Update each field if column exists
-            for field, column in field_mapping.items():
-                try:
-                    col_idx = headers.index(column) + 1
-                    if field in profile_data:
-                        value = profile_data[field]
-                        updates.append({
-                            'range': f'{gspread.utils.rowcol_to_a1(row_num, col_idx)}',
-                            'values': [[value]]
-                        })
-                except ValueError:
-                    # Column doesn't exist - create it
-                    headers.append(column)
-                    self.worksheet.update('A1', [headers])
-                    col_idx = len(headers)
-                    value = profile_data.get(field, '')
-                    updates.append({
-                        'range': f'{gspread.utils.rowcol_to_a1(row_num, col_idx)}',
-                        'values': [[value]]
-                    })
-            
-            # Update reels data if any
-            if profile_data.get('posts'):
-                posts_data = profile_data['posts']
-                for i, post in enumerate(posts_data, start=1):
-                    # Create/update reel columns
-                    post_fields = {
-                        f'Reel {i} URL': post.get('url', ''),
-                        f'Reel {i} Caption': post.get('caption', ''),
-                        f'Reel {i} Likes': post.get('likesCount', ''),
-                        f'Reel {i} Comments': post.get('commentsCount', ''),
-                        f'Reel {i} Views': post.get('viewCount', ''),
-                        f'Reel {i} Date': post.get('timestamp', '')
-                    }
-                    
-                    for field, value in post_fields.items():
-                        try:
-                            col_idx = headers.index(field) + 1
-                        except ValueError:
-                            headers.append(field)
-                            self.worksheet.update('A1', [headers])
-                            col_idx = len(headers)
-                        
-                        updates.append({
-                            'range': f'{gspread.utils.rowcol_to_a1(row_num, col_idx)}',
-                            'values': [[value]]
-                        })
-            
-            # Batch update all changes
-            if updates:
-                self.worksheet.batch_update(updates)
-                print(f"✅ Updated row {row_num} in sheet")
-                
+            await self.sheet_writer.ensure_headers(self.sheet_headers())
+            await self.sheet_writer.write_row(row_num, self.profile_to_columns(profile_data))
+            print(f"✅ Queued row {row_num} for sheet update")
         except Exception as e:
             print(f"❌ Error updating sheet: {str(e)}")
 
-    async def extract_grid_view_count(self, element):
-        """Extract view count from a reel in the grid view"""
+    async def flush_sheet(self):
+        """Send any buffered sheet updates and wait until they are written"""
+        if not self.sheet_writer:
+            return
         try:
-            # First try direct child elements
-            for selector in self.MODAL_SELECTORS['grid_views']:
-                try:
-                    view_element = await element.query_selector(selector)
-                    if view_element:
-                        view_text = await view_element.text_content()
-                        if view_text and ('view' in view_text.lower() or 'k' in view_text.lower() or 'm' in view_text.lower()):
-                            # Clean and parse the view count
-                            text = view_text.lower().replace('views', '').replace('view', '').strip()
-                            if 'k' in text:
-                                number = float(text.replace('k', '')) * 1000
-                                return int(number)
-                            elif 'm' in text:
-                                number = float(text.replace('m', '')) * 1000000
-                                return int(number)
-                            else:
-                                count = self.parse_count(text)
-                                if count > 0:
-                                    return count
-                except Exception as e:
-                    print(f"⚠️ Grid view selector error: {str(e)}")
-                    continue
+            await self.sheet_writer.flush(wait=True)
+        except Exception as e:
+            print(f"❌ Error flushing sheet updates: {str(e)}")
 
-            # Fallback: Try evaluating JavaScript to find view count
-            js_result = await element.evaluate('''
-                element => {
-                    const findViewCount = () => {
-                        const spans = element.querySelectorAll('span');
-                        for (const span of spans) {
-                            const text = span.textContent;
-                            if (text && (text.includes('K') || text.includes('M') || text.includes('view'))) {
-                                return text;
-                            }
-                        }
-                        return null;
-                    };
-                    return findViewCount();
-                }
-            ''')
-            
-            if js_result:
-                count = self.parse_count(js_result)
-                if count > 0:
-                    return count
+    async def collect_grid_reels(self, page, limit):
+        """Scroll the reels grid until limit unique reels have been seen
+        
+        The grid is virtualized - rows scrolled out of view are dropped from the DOM - so
+        each pass reads the rendered reels (hrefs and grid view counts, in DOM order, in
+        one evaluate call) into an ordered dedup map before scrolling on. Stops as soon as
+        limit reels are known, or when scrolling no longer turns up new ones.
+        
+        Returns:
+            list: (href, grid_views) tuples in grid order, at most limit long.
+        """
+        seen = {}
+        stalled = 0
+        view_selectors = self.selectors.ordered('grid_views', self.MODAL_SELECTORS['grid_views'])
+        while len(seen) < limit and stalled < self.grid_stall_passes:
+            try:
+                found = await page.evaluate(self.GRID_COLLECT_JS, {
+                    'postSelectors': self.POST_SELECTORS,
+                    'viewSelectors': view_selectors,
+                    'skip': list(seen),
+                    'limit': limit - len(seen),
+                    'scroll': self.grid_scroll_fraction,
+                })
+            except Exception as e:
+                print(f"⚠️ Error reading the reels grid: {str(e)}")
+                break
+            for item in found['items']:
+                for selector, hit, elapsed_ms in item['probes']:
+                    self.selectors.record('grid_views', selector, hit, elapsed_ms)
+                seen[item['href']] = self.parse_count(item['views']) if item['views'] else 0
+            if len(seen) >= limit:
+                break
+            # A pass that adds nothing counts towards giving up; rows may still be loading
+            stalled = 0 if found['items'] else stalled + 1
+            if found['atEnd'] and not found['items']:
+                stalled = max(stalled, self.grid_stall_passes - 1)  # One last look after loading
+            await self.waits.for_dom_stable(page, timeout_ms=2000)
+        self.metrics.count('grid_reels_collected', len(seen))
+        return list(seen.items())[:limit]
 
-            return 0
+def run_shard(shard_id, user_data_dir, profile_urls, input_indexes, settings, result_queue):
+    """Entry point of a shard process (see InstagramScraper.scrape_profiles_sharded)"""
+    asyncio.run(scrape_shard(shard_id, user_data_dir, profile_urls, input_indexes, settings, result_queue))
 
-        except Exception as e:
-            print(f"❌ Error extracting grid view count: {str(e)}")
-            return 0
 
-async def main():
-    scraper = InstagramScraper()
+async def scrape_shard(shard_id, user_data_dir, profile_urls, input_indexes, settings, result_queue):
+    """Scrape one shard on its own browser, sending ('result', (index, url), profile_data) per profile
+    
+    input_indexes holds each URL's position in the coordinator's input, which is the
+    index sent back. The shard's selector probes are sent back as ('selectors', shard_id, deltas) at the end.
+    """
+    scraper = InstagramScraper(connect_sheets=False)
+    metrics_prom_path = settings.pop('metrics_prom_path', None)
+    per_minute, min_per_minute, max_per_minute = settings.pop('rate_per_minute')
+    for attr, value in settings.items():
+        setattr(scraper, attr, value)
+    if metrics_prom_path:
+        scraper.metrics.prom_path = metrics_prom_path
+    limiter = scraper.rate_limiter
+    scraper.rate_limiter = RateLimiter(
+        per_minute, min_per_minute, max_per_minute, burst=limiter.burst,
+        cooldown_seconds=limiter.cooldown_seconds, max_cooldown_seconds=limiter.max_cooldown_seconds
+    )
+    scraper.rate_limiter.metrics = scraper.metrics
+    scraper.user_data_dir = user_data_dir
+    scraper.force_refresh = True  # The coordinator already took the fresh profiles
+    scraper.refresh_storage_state = False  # Shards share one export; the coordinator refreshes it
+    scraper.selectors.path = ''  # Probes go back to the coordinator, which saves them once
+    
+    async def send(index, url, profile_data):
+        result_queue.put(('result', (input_indexes[index], url), profile_data))
+    
+    try:
+        await scraper.setup_browser()
+        await scraper.scrape_profiles(profile_urls, on_result=send, collect=False)  # Results only stream back
+    except Exception as e:
+        print(f"❌ Shard {shard_id + 1} failed: {str(e)}")
+    finally:
+        await scraper.cleanup()
+        result_queue.put(('selectors', shard_id, scraper.selectors.pending))
+        result_queue.put(('done', shard_id, None))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Instagram Reels Scraper')
+    parser.add_argument('--reparse-snapshots', action='store_true',
+                        help='Update sheet rows from the HTML saved in SNAPSHOT_DIR without visiting profiles')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip rows finished by an earlier run and retry failed ones')
+    parser.add_argument('--cache-ttl', type=float, default=None, metavar='HOURS',
+                        help='Reuse cached results for profiles scraped within HOURS (default: CACHE_TTL_HOURS or 0)')
+    parser.add_argument('--force', action='store_true',
+                        help='Ignore the cache and scrape every profile')
+    parser.add_argument('--stale-only', action='store_true',
+                        help='Only scrape and write profiles whose cached result is older than the TTL')
+    parser.add_argument('--record-har', metavar='PATH',
+                        help='Save this run\'s traffic to a HAR file (replay it with benchmark.py)')
+    parser.add_argument('--delta', action='store_true',
+                        help='Only open reels that are new or whose grid view count changed past DELTA_THRESHOLD')
+    parser.add_argument('--login', action='store_true',
+                        help='Log in once and export the session to STORAGE_STATE_FILE; later runs start headless from it')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep a logged-in browser running for later runs to attach to with --cdp')
+    parser.add_argument('--daemon-port', type=int, default=int(os.getenv('BROWSER_DAEMON_PORT', '9222')),
+                        help='Remote debugging port of the daemon browser (default: 9222)')
+    parser.add_argument('--cdp', metavar='URL',
+                        help='Attach to a daemon browser, e.g. http://127.0.0.1:9222 (default: BROWSER_CDP_URL)')
+    parser.add_argument('--input', metavar='PATH',
+                        help='Read profile URLs from an xlsx or csv file instead of the Google Sheet')
+    parser.add_argument('--output', action='append', default=[], metavar='PATH',
+                        help='Also stream results to PATH (.jsonl, .csv or .parquet); repeatable')
+    parser.add_argument('--top-reels', type=int, default=None, metavar='N',
+                        help='Scrape the first N reels of every profile (default: TOP_REELS or 3)')
+    parser.add_argument('--shards', type=int, default=None, metavar='K',
+                        help='Split profiles across K browser processes (default: SCRAPER_SHARDS or 1)')
+    return parser.parse_args()
+
+async def main(args):
+    scraper = InstagramScraper(connect_sheets=False)
+    if args.cache_ttl is not None:
+        scraper.cache_ttl = args.cache_ttl * 3600
+    scraper.force_refresh = args.force
+    scraper.stale_only = args.stale_only
+    scraper.delta_mode = scraper.delta_mode or args.delta
+    if args.record_har:
+        scraper.har_record_path = args.record_har
+    if args.shards is not None:
+        scraper.shards = max(1, args.shards)
+    if args.top_reels is not None:
+        scraper.top_reels = max(1, args.top_reels)
+    scraper.output_paths.extend(args.output)
+    if args.cdp:
+        scraper.cdp_url = args.cdp
     
     try:
-        print("📊 Connecting to Google Sheets...")
-        scraper.setup_google_sheets()  # Setup Google Sheets connection first
+        if args.login:
+            print("🔑 Logging in to export the session...")
+            if not await scraper.export_login():
+                print("❌ Login failed - no session exported")
+            return
+        
+        if args.daemon:
+            print("🔥 Starting warm browser daemon...")
+            await scraper.run_daemon(args.daemon_port)
+            return
+        
+        if not args.input:
+            print("📊 Connecting to Google Sheets...")
+            scraper.setup_google_sheets()  # Setup Google Sheets connection first
+        
+        if args.reparse_snapshots:
+            print("🗂️ Re-parsing saved profile snapshots...")
+            await scraper.reparse_snapshots_to_sheet()
+            return
         
         print("🌐 Setting up browser...")
         await scraper.setup_browser()
@@ -1094,9 +3729,12 @@ async def main():
             print("❌ Login failed. Exiting...")
             return
         
-        # Scrape profiles from Google Sheet
+        # Scrape profiles from the input file or the Google Sheet
         print("🔄 Starting scraping process...")
-        await scraper.scrape_from_sheet()
+        if args.input:
+            await scraper.scrape_from_excel(args.input)
+        else:
+            await scraper.scrape_from_sheet(resume=args.resume)
         
         # Print summary
         scraper.save_results()
@@ -1111,4 +3749,4 @@ async def main():
 if __name__ == "__main__":
     print("🚀 Instagram Mobile Scraper Starting...")
     print("=" * 50)
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
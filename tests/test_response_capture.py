@@ -0,0 +1,108 @@
+"""ResponseCapture against saved Instagram API payloads
+
+The fixtures are trimmed copies of real responses: web_profile_info (GraphQL-style
+user object with its reels edge) and api/v1/clips/user (the reels tab feed).
+"""
+import asyncio
+import json
+import os
+
+import pytest
+
+from reels import ResponseCapture
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+BASE_URL = 'https://www.instagram.com'
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_web_profile_info_fills_profile_fields():
+    capture = ResponseCapture()
+    capture.ingest(load_fixture('web_profile_info.json'))
+
+    profile = capture.get_profile('Chef.Marie')
+    assert profile == {
+        'username': 'chef.marie',
+        'followers': 48213,
+        'totalposts': 734,
+        'name': 'Marie Dubois',
+        'description': 'Chef in Paris 🇫🇷 Bookings: marie@example.com',
+        'avatar': 'https://scontent.cdninstagram.com/v/t51/marie_320.jpg',
+    }
+
+
+def test_web_profile_info_fills_graphql_reel_fields():
+    capture = ResponseCapture()
+    capture.ingest(load_fixture('web_profile_info.json'))
+
+    media = capture.get_media(f'{BASE_URL}/reel/C8xYzAbCdEf/')
+    assert media['likesCount'] == 5230
+    assert media['commentsCount'] == 87
+    assert media['viewCount'] == 120455
+    assert media['caption'] == 'Croissants at 5am 🥐'
+    assert media['timestamp'] == '2024-06-10T06:13:20.000Z'
+
+
+def test_clips_feed_fills_reel_fields():
+    capture = ResponseCapture()
+    capture.ingest(load_fixture('clips_user.json'))
+
+    media = capture.get_media(f'{BASE_URL}/chef.marie/reel/C9AbCdEfGhI/?igsh=abc')
+    assert media == {
+        'shortcode': 'C9AbCdEfGhI',
+        'likesCount': 18342,
+        'commentsCount': 412,
+        'viewCount': 903211,
+        'caption': 'Sunday market haul',
+        'timestamp': '2024-06-27T14:53:20.000Z',
+    }
+
+    # Hidden likes stay 0 rather than missing; a null caption is left for the DOM
+    hidden = capture.get_media(f'{BASE_URL}/reel/C9JkLmNoPqR/')
+    assert hidden['likesCount'] == 0
+    assert 'caption' not in hidden
+
+
+def test_clips_feed_owner_is_not_a_profile():
+    capture = ResponseCapture()
+    capture.ingest(load_fixture('web_profile_info.json'))
+    capture.ingest(load_fixture('clips_user.json'))
+
+    # The reel owner stubs carry no counts, so they must not replace the full profile
+    assert capture.get_profile('chef.marie')['followers'] == 48213
+    assert capture.get_media(f'{BASE_URL}/reel/unknown/') == {}
+
+
+def test_fixtures_served_through_page_route():
+    async_api = pytest.importorskip('playwright.async_api')
+
+    async def run():
+        async with async_api.async_playwright() as playwright:
+            try:
+                browser = await playwright.chromium.launch(headless=True)
+            except Exception as e:
+                pytest.skip(f'Chromium not available: {e}')
+            page = await browser.new_page()
+
+            async def serve(route):
+                name = 'clips_user.json' if '/clips/' in route.request.url else 'web_profile_info.json'
+                with open(os.path.join(FIXTURES, name), 'rb') as f:
+                    await route.fulfill(status=200, content_type='application/json', body=f.read())
+
+            await page.route(f'{BASE_URL}/**', serve)
+            capture = ResponseCapture()
+            capture.attach(page)
+            await page.goto(f'{BASE_URL}/api/v1/users/web_profile_info/?username=chef.marie')
+            await page.goto(f'{BASE_URL}/api/v1/clips/user/')
+            await capture.settle()
+            capture.detach()
+            await browser.close()
+            return capture
+
+    capture = asyncio.run(run())
+    assert capture.get_profile('chef.marie')['followers'] == 48213
+    assert capture.get_media(f'{BASE_URL}/reel/C9AbCdEfGhI/')['likesCount'] == 18342